@@ -1,19 +1,17 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import errno
+import fcntl
+import os
 import random
 import shutil
-import xml.etree.ElementTree as et
+import sys
 from argparse import ArgumentParser
 
+from licenseplate.dataset import extract_from_xml
 
-def extract_from_xml(file: Path):
-    out = []
-    tree = et.parse(file)
-    for img in tree.findall('.//image'):
-        box = img.find('.//box')
-        plate = box.find('.//attribute')
-        tmp = img.attrib | box.attrib | {'plate_number': plate.text}
-        out.append(tmp)
-    return out
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
 
 
 def convert_to_xc_yc_w_h(data: dict) -> tuple[float, float, float, float]:
@@ -33,14 +31,116 @@ def convert_to_xc_yc_w_h(data: dict) -> tuple[float, float, float, float]:
     return round_to_n(x_center), round_to_n(y_center), round_to_n(width / img_width), round_to_n(height / img_height)
 
 
-
-def move_file_and_label(data: dict, img_dir: Path, image_to: Path, label_to: Path):
-    file = img_dir / data['name']
-    shutil.copy(file, image_to / file.name)
-    xc, yc, w, h = convert_to_xc_yc_w_h(data)
-    with open(label_to / (str(file.stem) + '.txt'), 'w') as f:
-        f.write(f"0 {xc} {yc} {w} {h}\n")
-
+def make_label(data: dict) -> str:
+    lines = []
+    for box in data['boxes']:
+        xc, yc, w, h = convert_to_xc_yc_w_h(data | box)
+        lines.append(f"0 {xc} {yc} {w} {h}\n")
+    return ''.join(lines)
+
+
+def is_up_to_date(source: Path, destination: Path) -> bool:
+    try:
+        dst_stat = destination.stat()
+    except FileNotFoundError:
+        return False
+    src_stat = source.stat()
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns <= dst_stat.st_mtime_ns
+
+
+def reflink(source: Path, destination: Path):
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            destination.unlink()
+            raise
+    shutil.copystat(source, destination)
+
+
+def link_file(source: Path, destination: Path, mode: str) -> bool:
+    """Links `source` to `destination`, returns False if it has to be copied instead."""
+    if mode == 'copy' or source.stat().st_dev != destination.parent.stat().st_dev:
+        return False
+    if destination.exists():
+        destination.unlink()
+    methods = {'reflink': [reflink], 'hardlink': [os.link], 'auto': [reflink, os.link]}[mode]
+    for method in methods:
+        try:
+            method(source, destination)
+            return True
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY,
+                               errno.EINVAL, errno.EMLINK):
+                raise
+    return False
+
+
+def write_label(content: str, path: Path) -> bool:
+    if path.exists() and path.read_text() == content:
+        return False
+    with open(path, 'w') as f:
+        f.write(content)
+    return True
+
+
+def remove_stale(directory: Path, expected: set[str]) -> int:
+    removed = 0
+    for file in directory.iterdir():
+        if file.name not in expected:
+            file.unlink()
+            removed += 1
+    return removed
+
+
+class Progress:
+    def __init__(self, total: int, label: str):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.step = max(1, total // 100)
+
+    def update(self, n: int = 1):
+        self.done += n
+        if self.done % self.step == 0 or self.done == self.total:
+            print(f"\r{self.label}: {self.done}/{self.total}", end='', file=sys.stderr, flush=True)
+            if self.done == self.total:
+                print(file=sys.stderr)
+
+
+def convert_split(data: list[dict], img_dir: Path, image_to: Path, label_to: Path,
+                  link_mode: str, workers: int, label: str) -> dict[str, int]:
+    stats = {'linked': 0, 'copied': 0, 'skipped': 0, 'labels': 0, 'removed': 0}
+    to_copy: list[tuple[Path, Path]] = []
+    progress = Progress(len(data), label)
+
+    for img_data in data:
+        source = img_dir / img_data['name']
+        image_destination = image_to / source.name
+        if write_label(make_label(img_data), label_to / (source.stem + '.txt')):
+            stats['labels'] += 1
+        if is_up_to_date(source, image_destination):
+            stats['skipped'] += 1
+            progress.update()
+        elif link_file(source, image_destination, link_mode):
+            stats['linked'] += 1
+            progress.update()
+        else:
+            to_copy.append((source, image_destination))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(shutil.copy2, src, dst) for src, dst in to_copy]
+        for future in as_completed(futures):
+            future.result()
+            stats['copied'] += 1
+            progress.update()
+
+    stats['removed'] += remove_stale(image_to, {Path(d['name']).name for d in data})
+    stats['removed'] += remove_stale(label_to, {Path(d['name']).stem + '.txt' for d in data})
+    return stats
 
 
 def main():
@@ -49,6 +149,12 @@ def main():
     parser.add_argument("destination", type=Path, help="Path to save the output")
     parser.add_argument("--divide", type=float, default=0.8, help="Ratio to split dataset (default: 0.8)")
     parser.add_argument("--seed", type=int, default=-1, help="Optional random seed for reproducibility")
+    parser.add_argument("--link", choices=['auto', 'reflink', 'hardlink', 'copy'], default='auto',
+                        help="How to place images when source and destination share a filesystem (default: auto)")
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                        help="Number of parallel copy workers")
+    parser.add_argument("--incremental", action='store_true',
+                        help="Update an existing conversion, skipping unchanged files (use with --seed)")
     args = parser.parse_args()
 
     image_path: Path = args.dataset.resolve() / 'photos'
@@ -74,15 +180,14 @@ def main():
 
     for path in (new_images_dir, new_images_dir / 'train', new_images_dir / 'val',
                  new_labels_dir, new_labels_dir / 'train', new_labels_dir / 'val'):
-        if path.exists():
+        if path.exists() and not args.incremental:
             raise FileExistsError(f"Directory {str(path)} already exists.")
-        path.mkdir()
-
-    for img_data in train:
-        move_file_and_label(img_data, image_path, new_images_dir / 'train', new_labels_dir / 'train')
+        path.mkdir(exist_ok=True)
 
-    for img_data in val:
-        move_file_and_label(img_data, image_path, new_images_dir / 'val', new_labels_dir / 'val')
+    for split_name, split in (('train', train), ('val', val)):
+        stats = convert_split(split, image_path, new_images_dir / split_name, new_labels_dir / split_name,
+                              args.link, args.workers, split_name)
+        print(f"{split_name}: " + ', '.join(f"{key} {value}" for key, value in stats.items()), file=sys.stderr)
 
     yaml_file_contents = f'''
 train: {str((new_images_dir / 'train').absolute())}
@@ -1,28 +1,93 @@
 from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass
-from time import sleep
-from typing import TextIO, Any
+from time import perf_counter, sleep
+from typing import Any, Optional
 from logging import Logger
 import json
+from collections import deque
 
 import cv2
+import numpy as np
+from numpy.typing import NDArray
 
-from .base import ActionInterface, CameraInterface, ManagerInterface, DetectionResults
-from .logger import get_standard_logger
-from .detection import YoloPlateDetectionModel, visualise_all
+from .base import (
+    ActionInterface,
+    CameraInterface,
+    ManagerInterface,
+    DetectionResults,
+    ExtractorResult,
+    PlateDetectionModel,
+)
+from .logger import LOG_FILENAME, LogRotation, get_rotating_logger, close_logger
+from .detection import visualise_all
+from .sinks import EventSink
+from .threads import pin_current_thread
+from .preview import PreviewChannel
+from .deferred import DeferredOcrSettings, DeferredOcrWorker, OcrQueue
+from . import tracing
+
+
+def summarise_extractions(ext_results: list[ExtractorResult]) -> list[dict[str, Any]]:
+    return [
+        {
+            "text": extraction_result.text,
+            "confidence": extraction_result.confidence,
+            "box": [list(point) for point in extraction_result.box],
+        }
+        for extraction_result in ext_results
+    ]
+
+
+class FrameStats:
+    """Frame counters of a camera, cheap enough to keep on all the time."""
+
+    def __init__(self, max_latencies: int = 10000):
+        self.latencies: deque[float] = deque(maxlen=max_latencies)
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.frames_with_plates = 0
+        self.latencies.clear()
+        self.started = perf_counter()
+
+    def record(self, latency: float, found_plates: bool):
+        self.frames += 1
+        self.frames_with_plates += found_plates
+        self.latencies.append(latency)
+
+    def fps(self) -> float:
+        return self.frames / max(perf_counter() - self.started, 1e-9)
+
+    def latency_percentiles(
+        self, percentiles: tuple[float, ...] = (50, 90, 99, 100)
+    ) -> dict[str, float]:
+        latencies = list(self.latencies)
+        if not latencies:
+            return {}
+        return {
+            f"p{p:g}": float(v)
+            for p, v in zip(percentiles, np.percentile(latencies, percentiles))
+        }
 
 
 class LocalSave(ActionInterface):
     def __init__(
         self,
-        detection_model: YoloPlateDetectionModel,
+        detection_model: PlateDetectionModel,
         camera: CameraInterface,
         max_fps: int,
         logging_root: Path,
         show_debug_boxes: bool = False,
         log_cropped_plates: bool = False,
         log_augmented_plates: bool = False,
+        sinks: Optional[list[EventSink]] = None,
+        log_rotation: Optional[LogRotation] = None,
+        cpu_affinity: Optional[list[int]] = None,
+        preview: Optional[PreviewChannel] = None,
+        ocr_worker: Optional[DeferredOcrWorker] = None,
+        deferred_ocr: bool = False,
     ):
         super().__init__(detection_model, camera, max_fps)
         self.logging_root = logging_root
@@ -34,9 +99,14 @@ class LocalSave(ActionInterface):
         self.debug_boxes = show_debug_boxes
         self.log_cropped_plates = log_cropped_plates
         self.log_augmented_plates = log_augmented_plates
+        self.sinks = sinks if sinks is not None else []
+        self.log_rotation = log_rotation
+        self.cpu_affinity = cpu_affinity
+        self.preview = preview
+        self.stats = FrameStats()
 
         self.logger: Logger | None = None
-        self.logger_io: TextIO | None = None
+        self._marked_image_buffer: NDArray | None = None
 
         self.logging_root.mkdir(exist_ok=True)
         self.original_image_root.mkdir(exist_ok=True)
@@ -46,12 +116,23 @@ class LocalSave(ActionInterface):
         if self.log_augmented_plates:
             self.augmented_plates_root.mkdir(exist_ok=True)
 
+        # with a worker, every plate left unread is queued, whether the camera
+        # defers OCR or the OCR time budget skipped it
+        self.ocr_worker = ocr_worker
+        self.deferred_ocr = deferred_ocr
+        self.ocr_queue: Optional[OcrQueue] = None
+        if ocr_worker is not None:
+            self.ocr_queue = OcrQueue(self.logging_root / "ocr-queue.sqlite3")
+            ocr_worker.add_queue(self.ocr_queue, self.log_ocr_update)
+        elif deferred_ocr:
+            raise ValueError("Deferring OCR needs a deferred OCR worker.")
+
     def log_detection(self, time: datetime, plates: DetectionResults, fps_now: float):
         assert self.logger is not None
         log_content: dict[str, Any] = {
             "time": time.isoformat(),
             "FPS": round(fps_now, 2),
-            "logger_name": self.logger.name,
+            "logger_name": self.logging_root.parts[-1],
         }
 
         original_image_path = self.original_image_root / f"{time.isoformat()}.jpg"
@@ -59,8 +140,12 @@ class LocalSave(ActionInterface):
         cropped_plate_path = self.cropped_plates_root / time.isoformat()
         augmented_plate_path = self.augmented_plates_root / time.isoformat()
 
-        cv2.imwrite(str(original_image_path), plates.original_image)
-        cv2.imwrite(str(marked_image_path), visualise_all(plates, self.debug_boxes))
+        self._write_image(original_image_path, plates.original_image)
+        with tracing.span("visualise"):
+            self._marked_image_buffer = visualise_all(
+                plates, self.debug_boxes, out=self._marked_image_buffer
+            )
+        self._write_image(marked_image_path, self._marked_image_buffer)
 
         if self.log_cropped_plates:
             cropped_plate_path.mkdir()
@@ -82,22 +167,16 @@ class LocalSave(ActionInterface):
 
         detection_summary = []
         for i, detection_result in enumerate(plates.det_results):
-            extraction_summary = []
-            for extraction_result in detection_result.ext_results:
-                extraction_info = {
-                    "text": extraction_result.text,
-                    "confidence": extraction_result.confidence,
-                    "box": str(extraction_result.box),
-                }
-                extraction_summary.append(extraction_info)
             detection_info: dict[str, Any] = {
                 "confidence": detection_result.finder_result.confidence,
-                "box": str(detection_result.finder_result.box),
-                "detected": extraction_summary,
+                "box": list(detection_result.finder_result.box),
+                "detected": summarise_extractions(detection_result.ext_results),
             }
+            if not detection_result.text_read:
+                detection_info["read"] = False
             if self.log_cropped_plates:
-                cv2.imwrite(
-                    str(cropped_plate_path / f"{time.isoformat()}-{i}.jpg"),
+                self._write_image(
+                    cropped_plate_path / f"{time.isoformat()}-{i}.jpg",
                     detection_result.cropped_plate_image,
                 )
                 detection_info["plate_image"] = str(
@@ -106,8 +185,8 @@ class LocalSave(ActionInterface):
                     )
                 )
             if self.log_augmented_plates:
-                cv2.imwrite(
-                    str(augmented_plate_path / f"{time.isoformat()}-{i}.jpg"),
+                self._write_image(
+                    augmented_plate_path / f"{time.isoformat()}-{i}.jpg",
                     detection_result.text_preprocessed_image,
                 )
                 detection_info["augmented_plate_image"] = str(
@@ -120,51 +199,140 @@ class LocalSave(ActionInterface):
         log_content["detected"] = detection_summary
 
         assert isinstance(self.logger, Logger)
-        self.logger.info(json.dumps(log_content, indent=4))
+        with tracing.span("logging"):
+            self.logger.info(json.dumps(log_content, separators=(",", ":")))
+
+            for sink in self.sinks:
+                sink.submit(log_content)
+
+        if self.ocr_queue is not None:
+            unread = [
+                (i, r.text_preprocessed_image)
+                for i, r in enumerate(plates.det_results)
+                if not r.text_read
+            ]
+            if unread:
+                with tracing.span("ocr_queue"):
+                    self.ocr_queue.put(log_content["time"], unread)
+                assert self.ocr_worker is not None
+                self.ocr_worker.notify()
+
+    def log_ocr_update(self, time: str, plate: int, ext_results: list[ExtractorResult]):
+        """Completes a logged plate that was left unread, called from the
+        deferred OCR worker."""
+        assert self.logger is not None
+        log_content = {
+            "type": "ocr_update",
+            "time": time,
+            "plate": plate,
+            "logger_name": self.logging_root.parts[-1],
+            "detected": summarise_extractions(ext_results),
+        }
+        self.logger.info(json.dumps(log_content, separators=(",", ":")))
+        for sink in self.sinks:
+            sink.submit(log_content)
+
+    def _write_image(self, path: Path, image: NDArray):
+        with tracing.span("imwrite", file=path.name):
+            cv2.imwrite(str(path), image)
+
+    def publish_preview(self, plates: DetectionResults):
+        assert self.preview is not None
+        if plates.det_results:
+            # already rendered for this frame by log_detection
+            assert self._marked_image_buffer is not None
+            self.preview.publish(self._marked_image_buffer)
+        else:
+            self.preview.publish(plates.original_image)
 
     def loop(self):
+        pin_current_thread(self.cpu_affinity)
+        tracing.name_thread(self.logging_root.parts[-1])
         lasted = 1 / self.max_fps
+        find_plates = (
+            self.detection_model.find_plates
+            if self.deferred_ocr
+            else self.detection_model.detect_plates
+        )
 
         while not self.stop_signal_initiated():
             frame_time = datetime.now()
+            tracing.begin_frame()
 
-            frame = self.camera.get_frame()
-            plates = self.detection_model.detect_plates(frame)
-            if plates.det_results:
-                self.log_detection(frame_time, plates, 1 / lasted)
+            with tracing.span("frame"):
+                with tracing.span("capture"):
+                    frame, lores_frame = self.camera.get_frames()
+                    captured = self.camera.last_capture_time() or perf_counter()
+                with tracing.span("detect_plates"):
+                    plates = find_plates(frame, lores_frame)
+                if plates.det_results:
+                    with tracing.span("log_detection"):
+                        self.log_detection(frame_time, plates, 1 / lasted)
+                if self.preview is not None and self.preview.wants_frame():
+                    with tracing.span("preview"):
+                        self.publish_preview(plates)
+                self.camera.release_frame(frame)
+            self.stats.record(perf_counter() - captured, bool(plates.det_results))
             lasted = (datetime.now() - frame_time).total_seconds()
 
             if 1 / self.max_fps - lasted > 0:
                 sleep(1 / self.max_fps - lasted)
 
+        if self.ocr_queue is not None:
+            self.ocr_queue.close()
+
     def start_thread(self):
-        self.logger_io = open(self.logging_root / "detected-plates.log", "+a")
-        self.logger = get_standard_logger(self.logging_root.parts[-1], self.logger_io)
+        self.logger = get_rotating_logger(
+            f"licenseplate.detections.{self.logging_root}",
+            self.logging_root,
+            LOG_FILENAME,
+            rotation=self.log_rotation,
+        )
         super().start_thread()
 
     def stop_thread(self):
         super().stop_thread()
-        assert self.logger_io is not None
-        self.logger_io.close()
+        assert self.logger is not None
+        close_logger(self.logger.name)
 
 
 @dataclass
 class LocalSaveManagerArguments:
     name: str
-    detection_model: YoloPlateDetectionModel
+    detection_model: PlateDetectionModel
     camera: CameraInterface
     max_fps: int
     show_debug_boxes: bool = False
     log_cropped_plates: bool = False
     log_augmented_plates: bool = False
+    cpu_affinity: Optional[list[int]] = None
+    preview: Optional[PreviewChannel] = None
+    deferred_ocr: bool = False
 
 
 class LocalSaveManager(ManagerInterface):
-    def __init__(self, cameras: list[LocalSaveManagerArguments], logging_root: Path):
+    def __init__(
+        self,
+        cameras: list[LocalSaveManagerArguments],
+        logging_root: Path,
+        sinks: Optional[list[EventSink]] = None,
+        log_rotation: Optional[LogRotation] = None,
+        deferred_ocr: Optional[DeferredOcrSettings] = None,
+    ):
         super().__init__()
         self.logging_root = logging_root.resolve()
         self.logging_root.mkdir(exist_ok=True)
+        self.sinks = sinks if sinks is not None else []
+        # one worker per model, so the cameras sharing a model share its
+        # CPU ceiling
+        self.ocr_workers: dict[int, DeferredOcrWorker] = {}
         for args in cameras:
+            ocr_worker = None
+            if deferred_ocr is not None:
+                ocr_worker = self.ocr_workers.setdefault(
+                    id(args.detection_model),
+                    DeferredOcrWorker(args.detection_model, deferred_ocr),
+                )
             camera = LocalSave(
                 detection_model=args.detection_model,
                 camera=args.camera,
@@ -173,5 +341,26 @@ class LocalSaveManager(ManagerInterface):
                 show_debug_boxes=args.show_debug_boxes,
                 log_cropped_plates=args.log_cropped_plates,
                 log_augmented_plates=args.log_augmented_plates,
+                sinks=self.sinks,
+                log_rotation=log_rotation,
+                cpu_affinity=args.cpu_affinity,
+                preview=args.preview,
+                ocr_worker=ocr_worker,
+                deferred_ocr=args.deferred_ocr,
             )
             self.cameras[args.name] = camera
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+        super().start()
+        for ocr_worker in self.ocr_workers.values():
+            ocr_worker.start()
+
+    def stop(self):
+        # the workers write to the camera logs, stop them before those close
+        for ocr_worker in self.ocr_workers.values():
+            ocr_worker.stop()
+        super().stop()
+        for sink in self.sinks:
+            sink.stop()
@@ -1,7 +1,7 @@
 import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Callable
+from typing import Callable, Optional
 
 from numpy.typing import NDArray
 
@@ -25,6 +25,7 @@ class SingleDetectionResult:
     text_preprocessed_image: NDArray
     finder_result: FinderResult
     ext_results: list[ExtractorResult]
+    text_read: bool = True
 
 
 @dataclass
@@ -36,7 +37,24 @@ class DetectionResults:
 
 class PlateDetectionModel(ABC):
     @abstractmethod
-    def detect_plates(self, image: NDArray) -> DetectionResults:
+    def detect_plates(
+        self, image: NDArray, lores_image: Optional[NDArray] = None
+    ) -> DetectionResults:
+        pass
+
+    def detect_plates_batch(self, images: list[NDArray]) -> list[DetectionResults]:
+        return [self.detect_plates(image) for image in images]
+
+    def find_plates(
+        self, image: NDArray, lores_image: Optional[NDArray] = None
+    ) -> DetectionResults:
+        """Locates plates, leaving them unread (text_read=False) if the model
+        can read them later with read_text."""
+        return self.detect_plates(image, lores_image)
+
+    @abstractmethod
+    def read_text(self, plate_image: NDArray) -> list[ExtractorResult]:
+        """Reads a plate image already run through the plate preprocessor."""
         pass
 
 
@@ -51,6 +69,17 @@ class CameraInterface(ABC):
     def get_frame(self) -> NDArray:
         pass
 
+    def get_frames(self) -> tuple[NDArray, Optional[NDArray]]:
+        return self.get_frame(), None
+
+    def release_frame(self, frame: NDArray) -> None:
+        pass
+
+    def last_capture_time(self) -> Optional[float]:
+        """perf_counter() time at which the last returned frame was captured,
+        if the camera knows it."""
+        return None
+
 
 preprocessor_type = Callable[[NDArray], NDArray]
 
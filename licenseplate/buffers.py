@@ -0,0 +1,26 @@
+import threading
+from collections import deque
+from typing import Optional
+
+from numpy.typing import NDArray
+
+
+class FrameBufferPool:
+    """Reusable frame buffers, handed out by a camera and returned once a frame
+    has been fully processed."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._free: deque[NDArray] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[NDArray]:
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def release(self, buffer: NDArray):
+        if buffer.base is not None or not buffer.flags.c_contiguous:
+            return
+        with self._lock:
+            if len(self._free) < self.capacity:
+                self._free.append(buffer)
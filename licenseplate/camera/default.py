@@ -3,21 +3,27 @@ import numpy as np
 from numpy.typing import NDArray
 
 from ..base import CameraInterface
+from ..buffers import FrameBufferPool
 
 
 class DefaultCameraInterface(CameraInterface):
-    def __init__(self, device: int = 0):
+    def __init__(self, device: int = 0, buffer_count: int = 2):
         self.device = device
         self.cap: cv2.VideoCapture | None = None
+        self.pool = FrameBufferPool(buffer_count)
 
     def get_frame(self) -> NDArray:
         assert isinstance(self.cap, cv2.VideoCapture)
-        ret, frame = self.cap.read()
+        buffer = self.pool.acquire()
+        ret, frame = self.cap.read(image=buffer)
         if not ret:
             print("Failed to grab a frame.")
             return np.zeros(shape=(3, 10, 10))
         return frame
 
+    def release_frame(self, frame: NDArray) -> None:
+        self.pool.release(frame)
+
     def start(self) -> None:
         self.cap = cv2.VideoCapture(self.device)
         if not self.cap.isOpened():
@@ -1,3 +1,6 @@
+from typing import Optional
+
+import cv2
 from numpy.typing import NDArray
 from picamera2 import Picamera2, Preview
 
@@ -5,8 +8,18 @@ from ..base import CameraInterface
 
 
 class RaspberryCameraInterface(CameraInterface):
-    def __init__(self, frame_dim: tuple[int, int], buffer_count: int):
+    def __init__(
+        self,
+        frame_dim: tuple[int, int],
+        buffer_count: int,
+        lores_dim: Optional[tuple[int, int]] = None,
+    ):
         self.picamera = Picamera2()
+        self.has_lores = lores_dim is not None
+
+        streams = {}
+        if lores_dim is not None:  # (width, height), as Picamera2 takes sizes
+            streams["lores"] = {"size": lores_dim, "format": "YUV420"}
 
         config = self.picamera.create_video_configuration(
             main={
@@ -14,6 +27,7 @@ class RaspberryCameraInterface(CameraInterface):
                 "format": "RGB888",
             },
             buffer_count=buffer_count,
+            **streams,
         )
         self.picamera.configure(config)
 
@@ -28,6 +42,12 @@ class RaspberryCameraInterface(CameraInterface):
         frame = self.picamera.capture_array()
         return frame
 
+    def get_frames(self) -> tuple[NDArray, Optional[NDArray]]:
+        if not self.has_lores:
+            return self.get_frame(), None
+        (frame, lores_yuv), _ = self.picamera.capture_arrays(["main", "lores"])
+        return frame, cv2.cvtColor(lores_yuv, cv2.COLOR_YUV2BGR_I420)
+
     def start(self) -> None:
         self.picamera.start()
 
@@ -0,0 +1,51 @@
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Optional
+
+import cv2
+from numpy.typing import NDArray
+
+from ..base import CameraInterface
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class SyntheticCameraInterface(CameraInterface):
+    """Plays the images of a directory in a loop at a fixed frame rate. Like a
+    real sensor it keeps capturing when the reader falls behind, so slow
+    readers get the latest frame and the skipped ones count as dropped."""
+
+    def __init__(self, image_dir: Path, fps: float = 10.0, max_images: int = 50):
+        paths = sorted(
+            p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+        )[:max_images]
+        self.images = [
+            image for image in map(cv2.imread, map(str, paths)) if image is not None
+        ]
+        if not self.images:
+            raise IOError(f"No images found in {image_dir}.")
+        self.fps = fps
+        self.dropped_frames = 0
+        self._index = -1
+        self._next_capture: Optional[float] = None
+        self._last_capture: Optional[float] = None
+
+    def get_frame(self) -> NDArray:
+        now = perf_counter()
+        if self._next_capture is None:
+            self._next_capture = now
+        if now < self._next_capture:
+            sleep(self._next_capture - now)
+            now = self._next_capture
+        skipped = int((now - self._next_capture) * self.fps)
+        self.dropped_frames += skipped
+        self._last_capture = self._next_capture + skipped / self.fps
+        self._next_capture = self._last_capture + 1 / self.fps
+        self._index = (self._index + 1 + skipped) % len(self.images)
+        return self.images[self._index]
+
+    def last_capture_time(self) -> Optional[float]:
+        return self._last_capture
+
+    def start(self) -> None:
+        self._next_capture = None
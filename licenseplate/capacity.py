@@ -0,0 +1,174 @@
+import json
+import resource
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Any, Optional
+
+from .action import LocalSave, LocalSaveManager, LocalSaveManagerArguments
+from .base import PlateDetectionModel
+from .camera.synthetic import SyntheticCameraInterface
+
+
+@dataclass
+class CapacitySettings:
+    cameras: int = 1
+    fps: float = 10.0
+    duration: float = 60.0
+    warmup: float = 10.0
+    sample_interval: float = 5.0
+    trace_memory: bool = False
+    log_cropped_plates: bool = False
+    log_augmented_plates: bool = False
+
+
+@dataclass
+class ResourceSample:
+    elapsed: float
+    cpu_percent: float
+    rss_bytes: Optional[int]
+    traced_bytes: Optional[int] = None
+
+
+@dataclass
+class CapacityReport:
+    settings: CapacitySettings
+    cameras: dict[str, dict[str, Any]] = field(default_factory=dict)
+    samples: list[ResourceSample] = field(default_factory=list)
+    peak_rss_bytes: int = 0
+    rss_growth_bytes: Optional[int] = None
+    top_allocation_growth: list[str] = field(default_factory=list)
+
+
+def current_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def peak_rss() -> int:
+    # kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def camera_report(camera: LocalSave) -> dict[str, Any]:
+    assert isinstance(camera.camera, SyntheticCameraInterface)
+    return {
+        "frames": camera.stats.frames,
+        "frames_with_plates": camera.stats.frames_with_plates,
+        "fps": camera.stats.fps(),
+        "dropped_frames": camera.camera.dropped_frames,
+        "latency_seconds": camera.stats.latency_percentiles(),
+    }
+
+
+def run_capacity_test(
+    detection_model: PlateDetectionModel,
+    image_dir: Path,
+    logging_root: Path,
+    settings: CapacitySettings,
+) -> CapacityReport:
+    """Runs synthetic cameras through a LocalSaveManager and measures how well
+    the host keeps up. Measurements start after the warm-up."""
+    arguments = [
+        LocalSaveManagerArguments(
+            name=f"camera{i}",
+            detection_model=detection_model,
+            camera=SyntheticCameraInterface(image_dir, settings.fps),
+            max_fps=int(settings.fps) + 1,  # paced by the camera
+            log_cropped_plates=settings.log_cropped_plates,
+            log_augmented_plates=settings.log_augmented_plates,
+        )
+        for i in range(1, settings.cameras + 1)
+    ]
+    manager = LocalSaveManager(arguments, logging_root)
+    report = CapacityReport(settings)
+
+    manager.start()
+    try:
+        sleep(settings.warmup)
+        for camera in manager.cameras.values():
+            assert isinstance(camera, LocalSave)
+            camera.stats.reset()
+            assert isinstance(camera.camera, SyntheticCameraInterface)
+            camera.camera.dropped_frames = 0
+        if settings.trace_memory:
+            tracemalloc.start()
+            first_snapshot = tracemalloc.take_snapshot()
+
+        started = last_time = perf_counter()
+        last_cpu = cpu_seconds()
+        while last_time - started < settings.duration:
+            sleep(
+                min(settings.sample_interval, settings.duration - (last_time - started))
+            )
+            now, cpu = perf_counter(), cpu_seconds()
+            report.samples.append(
+                ResourceSample(
+                    elapsed=round(now - started, 3),
+                    cpu_percent=100 * (cpu - last_cpu) / (now - last_time),
+                    rss_bytes=current_rss(),
+                    traced_bytes=tracemalloc.get_traced_memory()[0]
+                    if settings.trace_memory
+                    else None,
+                )
+            )
+            last_time, last_cpu = now, cpu
+            print(
+                f"\r{report.samples[-1].elapsed:.0f}s, "
+                f"CPU {report.samples[-1].cpu_percent:.0f}%",
+                end="",
+                file=sys.stderr,
+                flush=True,
+            )
+        print(file=sys.stderr)
+
+        for name, camera in manager.cameras.items():
+            assert isinstance(camera, LocalSave)
+            report.cameras[name] = camera_report(camera)
+        if settings.trace_memory:
+            growth = tracemalloc.take_snapshot().compare_to(first_snapshot, "lineno")
+            report.top_allocation_growth = [str(stat) for stat in growth[:10]]
+            tracemalloc.stop()
+    finally:
+        manager.stop()
+
+    report.peak_rss_bytes = peak_rss()
+    rss = [s.rss_bytes for s in report.samples if s.rss_bytes is not None]
+    if len(rss) >= 2:
+        report.rss_growth_bytes = rss[-1] - rss[0]
+    return report
+
+
+def print_report(report: CapacityReport):
+    target = report.settings.fps
+    for name, camera in report.cameras.items():
+        latency = camera["latency_seconds"]
+        print(
+            f"{name}: {camera['fps']:.2f}/{target:g} FPS, "
+            f"{camera['dropped_frames']} dropped, latency "
+            + ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in latency.items())
+        )
+    if report.samples:
+        cpu = sum(s.cpu_percent for s in report.samples) / len(report.samples)
+        print(f"CPU: {cpu:.0f}% on average (100% = one core)")
+    print(f"Peak RSS: {report.peak_rss_bytes / 2**20:.0f} MiB")
+    if report.rss_growth_bytes is not None:
+        print(f"RSS growth: {report.rss_growth_bytes / 2**20:+.1f} MiB")
+    for line in report.top_allocation_growth:
+        print(f"  {line}")
+
+
+def write_report(report: CapacityReport, path: Path):
+    with open(path, "w") as f:
+        json.dump(asdict(report), f, indent=4)
@@ -0,0 +1,31 @@
+from pathlib import Path
+from typing import Iterator
+import xml.etree.ElementTree as et
+
+
+def iter_images_from_xml(file: Path) -> Iterator[dict]:
+    context = et.iterparse(file, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end" or elem.tag != "image":
+            continue
+        boxes = []
+        for box in elem.iter("box"):
+            plate = box.find(".//attribute")
+            plate_number = plate.text if plate is not None else None
+            boxes.append(dict(box.attrib) | {"plate_number": plate_number})
+        yield dict(elem.attrib) | {"boxes": boxes}
+        root.clear()
+
+
+def extract_from_xml(file: Path) -> list[dict]:
+    return list(iter_images_from_xml(file))
+
+
+def load_ground_truth(dataset_dir: Path) -> list[tuple[Path, list[str]]]:
+    image_dir = dataset_dir / "photos"
+    out = []
+    for img in iter_images_from_xml(dataset_dir / "annotations.xml"):
+        plates = [box["plate_number"] for box in img["boxes"] if box["plate_number"]]
+        out.append((image_dir / img["name"], plates))
+    return out
@@ -0,0 +1,195 @@
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic, process_time
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from .base import ExtractorResult, PlateDetectionModel
+from .threads import available_cores
+
+
+@dataclass
+class DeferredOcrSettings:
+    cpu_ceiling: float = 0.5
+    poll_interval: float = 0.5
+    retry_interval: float = 10.0
+    max_attempts: int = 5
+
+
+class OcrQueue:
+    """Plates waiting to be read, kept in SQLite so they survive restarts.
+    Each thread gets its own connection."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            "id INTEGER PRIMARY KEY, time TEXT, plate INTEGER, image BLOB, "
+            "attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def put(self, time: str, plates: list[tuple[int, NDArray]]):
+        rows = []
+        for plate, image in plates:
+            _, encoded = cv2.imencode(".png", image)
+            rows.append((time, plate, encoded.tobytes()))
+        connection = self._connection()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO pending (time, plate, image) VALUES (?, ?, ?)", rows
+            )
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def peek(self) -> Optional[tuple[int, str, int, NDArray, int]]:
+        """The oldest plate as (id, time, plate, image, failed attempts)."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT id, time, plate, image, attempts FROM pending "
+                "ORDER BY id LIMIT 1"
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        row_id, time, plate, data, attempts = row
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+        return row_id, time, plate, image, attempts
+
+    def count_attempt(self, row_id: int):
+        self._connection().execute(
+            "UPDATE pending SET attempts = attempts + 1 WHERE id = ?", (row_id,)
+        )
+
+    def remove(self, row_id: int):
+        self._connection().execute("DELETE FROM pending WHERE id = ?", (row_id,))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+OcrCallback = Callable[[str, int, list[ExtractorResult]], None]
+
+
+class DeferredOcrWorker:
+    """Reads queued plates in the background while the process uses less than
+    `cpu_ceiling` of the available cores, so detection keeps its frame rate
+    during peaks and the backlog is cleared when things calm down.
+
+    One worker serves all cameras of a model, taking their queues in turn, so
+    the ceiling holds however many cameras there are."""
+
+    def __init__(self, model: PlateDetectionModel, settings: DeferredOcrSettings):
+        self.model = model
+        self.settings = settings
+        self._queues: list[tuple[OcrQueue, OcrCallback]] = []
+        self._next_queue = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cores = available_cores()
+        self._last_check = (monotonic(), process_time())
+        self._usage = float("inf")
+
+    def add_queue(self, queue: OcrQueue, on_read: OcrCallback):
+        """Serves `queue`, passing each reading to `on_read`. Call before start."""
+        self._queues.append((queue, on_read))
+
+    def notify(self):
+        self._wake.set()
+
+    def _wait_for_cpu(self):
+        """Waits while the CPU use of the whole process, measured over at least
+        `poll_interval`, is above the ceiling."""
+        while not self._stop.is_set():
+            now, cpu = monotonic(), process_time()
+            elapsed = now - self._last_check[0]
+            if elapsed > 4 * self.settings.poll_interval:
+                self._last_check = (now, cpu)  # stale after an idle period
+                self._usage = float("inf")
+            elif elapsed >= self.settings.poll_interval:
+                self._usage = (cpu - self._last_check[1]) / elapsed / self._cores
+                self._last_check = (now, cpu)
+            if self._usage <= self.settings.cpu_ceiling:
+                return
+            self._stop.wait(self.settings.poll_interval)
+
+    def _next_item(self):
+        """The oldest plate of the next queue that has one."""
+        for offset in range(len(self._queues)):
+            index = (self._next_queue + offset) % len(self._queues)
+            queue, on_read = self._queues[index]
+            item = queue.peek()
+            if item is not None:
+                self._next_queue = index + 1
+                return queue, on_read, item
+        return None
+
+    def loop(self):
+        while not self._stop.is_set():
+            found = self._next_item()
+            if found is None:
+                self._wake.wait(self.settings.poll_interval)
+                self._wake.clear()
+                continue
+            self._wait_for_cpu()
+            if self._stop.is_set():
+                break
+            queue, on_read, (row_id, time, plate, image, attempts) = found
+            if image is None:
+                print(f"Dropping undecodable queued plate {plate} of {time}.")
+            else:
+                try:
+                    on_read(time, plate, self.model.read_text(image))
+                except OSError as e:
+                    # e.g. the detection server is unreachable
+                    if attempts + 1 < self.settings.max_attempts:
+                        print(f"Deferred OCR unavailable, retrying later: {e}")
+                        queue.count_attempt(row_id)
+                        self._stop.wait(self.settings.retry_interval)
+                        continue
+                    print(
+                        f"Dropping queued plate {plate} of {time} after "
+                        f"{attempts + 1} failed attempts: {e}"
+                    )
+                except Exception as e:
+                    print(f"Deferred OCR of plate {plate} of {time} failed: {e}")
+            queue.remove(row_id)
+        for queue, _ in self._queues:
+            queue.close()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -1,41 +1,129 @@
 from typing import Optional
 from pathlib import Path
+from dataclasses import dataclass
+from collections import OrderedDict
+from time import monotonic, perf_counter
+import threading
 
+import numpy as np
 from numpy.typing import NDArray
 import cv2
 import easyocr
 from ultralytics import YOLO
 
 from . import base
+from . import tracing
+
+
+@dataclass
+class FinderGates:
+    min_confidence: Optional[float] = None
+    nms_iou: Optional[float] = None
+    max_detections: Optional[int] = None
+    min_width: int = 0
+    min_height: int = 0
+    min_aspect_ratio: Optional[float] = None
+    max_aspect_ratio: Optional[float] = None
+    top_k: Optional[int] = None
 
 
 class LicensePlateFinder:
-    def __init__(self, weights_path: Path):
+    def __init__(
+        self,
+        weights_path: Path,
+        image_size: Optional[int] = None,
+        gates: Optional[FinderGates] = None,
+    ):
         self.model = YOLO(weights_path)
+        self.image_size = image_size
+        self.gates = gates if gates is not None else FinderGates()
 
-    def run(self, image: NDArray) -> list[base.FinderResult]:
-        result = self.model(image, verbose=False)[0]
-        out = []
+        self.predict_kwargs = {}
+        if self.image_size is not None:
+            self.predict_kwargs["imgsz"] = self.image_size
+        if self.gates.min_confidence is not None:
+            self.predict_kwargs["conf"] = self.gates.min_confidence
+        if self.gates.nms_iou is not None:
+            self.predict_kwargs["iou"] = self.gates.nms_iou
+        if self.gates.max_detections is not None:
+            self.predict_kwargs["max_det"] = self.gates.max_detections
 
-        for box in result.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            confidence = box.conf[0].item()
-            out.append(base.FinderResult(confidence=confidence, box=(x1, y1, x2, y2)))
+    def run(
+        self, image: NDArray, output_shape: Optional[tuple[int, int]] = None
+    ) -> list[base.FinderResult]:
+        return self.run_batch([image], [output_shape])[0]
 
-        return sorted(out, key=lambda x: x.confidence, reverse=True)
+    def run_batch(
+        self,
+        images: list[NDArray],
+        output_shapes: Optional[list[Optional[tuple[int, int]]]] = None,
+    ) -> list[list[base.FinderResult]]:
+        """Finds plates in every image. Boxes are given in the coordinates of the
+        matching output shape, if any, and filtered by the finder gates."""
+        results = self.model(images, verbose=False, **self.predict_kwargs)
+        if output_shapes is None:
+            output_shapes = [None] * len(images)
+        return [
+            self._parse(result, image.shape[:2], output_shape)
+            for result, image, output_shape in zip(results, images, output_shapes)
+        ]
 
-    def __call__(self, image: NDArray) -> list[base.FinderResult]:
-        return self.run(image)
+    def _parse(
+        self,
+        result,
+        image_shape: tuple[int, int],
+        output_shape: Optional[tuple[int, int]],
+    ) -> list[base.FinderResult]:
+        xyxy = result.boxes.xyxy.cpu().numpy()
+        confidence = result.boxes.conf.cpu().numpy()
+
+        if output_shape is not None and output_shape != image_shape:
+            height, width = output_shape
+            scale_x = width / image_shape[1]
+            scale_y = height / image_shape[0]
+            xyxy = xyxy * np.array([scale_x, scale_y, scale_x, scale_y])
+            xyxy = np.clip(xyxy, 0, [width, height, width, height])
+        xyxy = xyxy.astype(int)
+
+        keep = self._gate(xyxy, confidence)
+        xyxy, confidence = xyxy[keep], confidence[keep]
+        order = np.argsort(-confidence, kind="stable")[: self.gates.top_k]
+
+        return [
+            base.FinderResult(confidence=c, box=tuple(b))
+            for b, c in zip(xyxy[order].tolist(), confidence[order].tolist())
+        ]
+
+    def _gate(self, xyxy: NDArray, confidence: NDArray) -> NDArray:
+        width = xyxy[:, 2] - xyxy[:, 0]
+        height = xyxy[:, 3] - xyxy[:, 1]
+        keep = (width >= max(self.gates.min_width, 1)) & (
+            height >= max(self.gates.min_height, 1)
+        )
+        if self.gates.min_confidence is not None:
+            keep &= confidence >= self.gates.min_confidence
+        aspect_ratio = width / np.maximum(height, 1)
+        if self.gates.min_aspect_ratio is not None:
+            keep &= aspect_ratio >= self.gates.min_aspect_ratio
+        if self.gates.max_aspect_ratio is not None:
+            keep &= aspect_ratio <= self.gates.max_aspect_ratio
+        return keep
+
+    def __call__(
+        self, image: NDArray, output_shape: Optional[tuple[int, int]] = None
+    ) -> list[base.FinderResult]:
+        return self.run(image, output_shape)
 
 
 class TextExtractor:
-    def __init__(self, allow_list: Optional[str] = None):
+    def __init__(self, allow_list: Optional[str] = None, decoder: str = "beamsearch"):
         self.allow_list = allow_list
+        self.decoder = decoder
         self.reader = easyocr.Reader(["en"])
 
     def run(self, image: NDArray) -> list[base.ExtractorResult]:
         detected = self.reader.readtext(
-            image, allowlist=self.allow_list, decoder="beamsearch"
+            image, allowlist=self.allow_list, decoder=self.decoder
         )
         out = []
 
@@ -52,6 +140,148 @@ class TextExtractor:
         return self.run(image)
 
 
+@dataclass
+class _CachedReading:
+    time: float
+    aspect: int
+    fingerprint: NDArray
+    shape: tuple[int, int]
+    results: list[base.ExtractorResult]
+
+
+class CachedTextExtractor:
+    """LRU cache of OCR results in front of a TextExtractor, so a plate that
+    stays in view (parked or queued cars) is only read once every `ttl` seconds.
+
+    Crops are matched by a downscaled binary fingerprint. By default only equal
+    fingerprints match; allowing a fraction `max_distance` of differing bits
+    tolerates more jitter of the finder box, but above about 0.02 plates that
+    differ in a single character start to match as well."""
+
+    def __init__(
+        self,
+        extractor: TextExtractor,
+        max_size: int = 256,
+        ttl: float = 30.0,
+        fingerprint_size: tuple[int, int] = (64, 16),
+        max_distance: float = 0.0,
+        report_interval: Optional[float] = 300.0,
+    ):
+        self.extractor = extractor
+        self.max_size = max_size
+        self.ttl = ttl
+        self.fingerprint_size = fingerprint_size
+        self.max_distance = max_distance
+        self.report_interval = report_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[int, bytes], _CachedReading] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_report = monotonic()
+
+    def fingerprint(self, image: NDArray) -> tuple[int, NDArray]:
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(image, self.fingerprint_size, interpolation=cv2.INTER_AREA)
+        height, width = image.shape[:2]
+        return round(4 * width / max(height, 1)), small > small.mean()
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _report(self, now: float):
+        if (
+            self.report_interval is None
+            or now - self._last_report < self.report_interval
+        ):
+            return
+        self._last_report = now
+        stats = self.stats()
+        print(
+            f"OCR cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate), {stats['size']} entries."
+        )
+
+    def _lookup(
+        self, key: tuple[int, bytes], fingerprint: NDArray, now: float
+    ) -> Optional[_CachedReading]:
+        if self.max_distance <= 0:
+            found = self._entries.get(key)
+            if found is not None and now - found.time > self.ttl:
+                del self._entries[key]
+                found = None
+            if found is not None:
+                self._entries.move_to_end(key)
+            return found
+
+        max_differing = self.max_distance * fingerprint.size
+        expired = []
+        found = None
+        for entry_key in reversed(self._entries):
+            entry = self._entries[entry_key]
+            if now - entry.time > self.ttl:
+                expired.append(entry_key)
+            elif (
+                entry.aspect == key[0]
+                and np.count_nonzero(entry.fingerprint != fingerprint) <= max_differing
+            ):
+                self._entries.move_to_end(entry_key)
+                found = entry
+                break
+        for entry_key in expired:
+            del self._entries[entry_key]
+        return found
+
+    def run(self, image: NDArray) -> list[base.ExtractorResult]:
+        aspect, fingerprint = self.fingerprint(image)
+        key = (aspect, np.packbits(fingerprint).tobytes())
+        height, width = image.shape[:2]
+        now = monotonic()
+        with self._lock:
+            self._report(now)
+            cached = self._lookup(key, fingerprint, now)
+            if cached is not None:
+                self.hits += 1
+                cached_height, cached_width = cached.shape
+                return rescale_extractor_results(
+                    cached.results, width / cached_width, height / cached_height
+                )
+            self.misses += 1
+
+        results = self.extractor(image)
+
+        with self._lock:
+            self._entries[key] = _CachedReading(
+                now, aspect, fingerprint, (height, width), results
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return results
+
+    def __call__(self, image: NDArray) -> list[base.ExtractorResult]:
+        return self.run(image)
+
+
+def rescale_extractor_results(
+    results: list[base.ExtractorResult], scale_x: float, scale_y: float
+) -> list[base.ExtractorResult]:
+    return [
+        base.ExtractorResult(
+            text=r.text,
+            confidence=r.confidence,
+            box=tuple((round(x * scale_x), round(y * scale_y)) for x, y in r.box),
+        )
+        for r in results
+    ]
+
+
 class YoloPlateDetectionModel(base.PlateDetectionModel):
     def __init__(
         self,
@@ -60,16 +290,86 @@ class YoloPlateDetectionModel(base.PlateDetectionModel):
         license_plate_preprocessor: base.preprocessor_type,
         text_allow_list: Optional[str] = None,
         required_confidence: float = 0.5,
+        image_size: Optional[int] = None,
+        ocr_decoder: str = "beamsearch",
+        detection_width: Optional[int] = None,
+        finder_gates: Optional[FinderGates] = None,
+        ocr_time_budget: Optional[float] = None,
+        ocr_cache_size: Optional[int] = None,
+        ocr_cache_ttl: float = 30.0,
+        ocr_cache_max_distance: float = 0.0,
     ):
-        self.finder = LicensePlateFinder(yolo_weights_path)
-        self.extractor = TextExtractor(text_allow_list)
+        self.finder = LicensePlateFinder(yolo_weights_path, image_size, finder_gates)
+        self.extractor: TextExtractor | CachedTextExtractor = TextExtractor(
+            text_allow_list, ocr_decoder
+        )
+        if ocr_cache_size:
+            self.extractor = CachedTextExtractor(
+                self.extractor,
+                max_size=ocr_cache_size,
+                ttl=ocr_cache_ttl,
+                max_distance=ocr_cache_max_distance,
+            )
         self.original_image_preprocessor = original_frame_preprocessor
         self.license_plate_preprocessor = license_plate_preprocessor
         self.required_confidence = required_confidence
+        self.detection_width = detection_width
+        self.ocr_time_budget = ocr_time_budget
+        self._ocr_time_estimate = 0.0
+        self._ocr_time_lock = threading.Lock()  # cameras share the model
+
+    def downscale_for_detection(self, image: NDArray) -> NDArray:
+        height, width = image.shape[:2]
+        if self.detection_width is None or self.detection_width >= width:
+            return image
+        new_height = round(height * self.detection_width / width)
+        return cv2.resize(
+            image, (self.detection_width, new_height), interpolation=cv2.INTER_AREA
+        )
+
+    def get_detection_image(
+        self, preprocessed_image: NDArray, lores_image: Optional[NDArray] = None
+    ) -> NDArray:
+        if lores_image is not None:
+            return self.original_image_preprocessor(lores_image)
+        return self.downscale_for_detection(preprocessed_image)
+
+    def find_plates(
+        self, image: NDArray, lores_image: Optional[NDArray] = None
+    ) -> base.DetectionResults:
+        with tracing.span("preprocess"):
+            preprocessed_image = self.original_image_preprocessor(image)
+            detection_image = self.get_detection_image(preprocessed_image, lores_image)
+        with tracing.span("yolo"):
+            found_boxes = self.finder(detection_image, preprocessed_image.shape[:2])
+        return self.crop_plates(image, preprocessed_image, found_boxes)
 
-    def detect_plates(self, image: NDArray) -> base.DetectionResults:
-        preprocessed_image = self.original_image_preprocessor(image)
-        found_boxes = self.finder(preprocessed_image)
+    def detect_plates(
+        self, image: NDArray, lores_image: Optional[NDArray] = None
+    ) -> base.DetectionResults:
+        return self.read_plates(self.find_plates(image, lores_image))
+
+    def detect_plates_batch(self, images: list[NDArray]) -> list[base.DetectionResults]:
+        preprocessed_images = [self.original_image_preprocessor(i) for i in images]
+        detection_images = [
+            self.get_detection_image(image) for image in preprocessed_images
+        ]
+        found_boxes = self.finder.run_batch(
+            detection_images, [image.shape[:2] for image in preprocessed_images]
+        )
+        return [
+            self.read_plates(self.crop_plates(image, preprocessed_image, boxes))
+            for image, preprocessed_image, boxes in zip(
+                images, preprocessed_images, found_boxes
+            )
+        ]
+
+    def crop_plates(
+        self,
+        image: NDArray,
+        preprocessed_image: NDArray,
+        found_boxes: list[base.FinderResult],
+    ) -> base.DetectionResults:
         out = base.DetectionResults(
             original_image=image,
             general_preprocessed_image=preprocessed_image,
@@ -79,24 +379,67 @@ class YoloPlateDetectionModel(base.PlateDetectionModel):
         for box in found_boxes:
             x1, y1, x2, y2 = box.box
             cropped_image = preprocessed_image[y1:y2, x1:x2]
-            altered_image = self.license_plate_preprocessor(cropped_image)
-            found_text = self.extractor(altered_image)
-            found_text = list(
-                filter(lambda x: x.confidence >= self.required_confidence, found_text)
-            )
-
             out.det_results.append(
                 base.SingleDetectionResult(
                     cropped_plate_image=cropped_image,
-                    text_preprocessed_image=altered_image,
+                    text_preprocessed_image=self.license_plate_preprocessor(
+                        cropped_image
+                    ),
                     finder_result=box,
-                    ext_results=found_text,
+                    ext_results=[],
+                    text_read=False,
                 )
             )
+        return out
+
+    def read_text(self, plate_image: NDArray) -> list[base.ExtractorResult]:
+        return [
+            r
+            for r in self.extractor(plate_image)
+            if r.confidence >= self.required_confidence
+        ]
+
+    def read_plates(self, out: base.DetectionResults) -> base.DetectionResults:
+        order = list(enumerate(out.det_results))
+        if self.ocr_time_budget is not None:
+            order.sort(key=lambda x: plate_priority(x[1]), reverse=True)
+        deadline = perf_counter() + (self.ocr_time_budget or 0.0)
+
+        for n, (i, det_result) in enumerate(order):
+            now = perf_counter()
+            # the top plate is always read, which also lets the estimate come
+            # down again after a slow call such as EasyOCR's first one
+            if (
+                n > 0
+                and self.ocr_time_budget is not None
+                and deadline - now < self._ocr_time_estimate
+            ):
+                break
+            with tracing.span("ocr", plate=i):
+                det_result.ext_results = self.read_text(
+                    det_result.text_preprocessed_image
+                )
+            det_result.text_read = True
+            with self._ocr_time_lock:
+                self._ocr_time_estimate = 0.8 * self._ocr_time_estimate + 0.2 * (
+                    perf_counter() - now
+                )
 
         return out
 
 
+def plate_priority(det_result: base.SingleDetectionResult) -> float:
+    """Finder confidence weighted by plate area and sharpness (variance of the
+    Laplacian of the crop)."""
+    crop = det_result.cropped_plate_image
+    if crop.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    height, width = crop.shape[:2]
+    return det_result.finder_result.confidence * width * height * sharpness
+
+
 def convert_extractor_bbox_to_whole_image(
     finder_bbox_xyxy: tuple[int, int, int, int], extractor_bbox_points: tuple
 ):
@@ -106,15 +449,23 @@ def convert_extractor_bbox_to_whole_image(
 
 
 def visualise_all(
-    result: base.DetectionResults, show_debug_boxes: bool = False
+    result: base.DetectionResults,
+    show_debug_boxes: bool = False,
+    out: Optional[NDArray] = None,
 ) -> NDArray:
-    image = result.general_preprocessed_image.copy()
+    source = result.general_preprocessed_image
+    if out is not None and out.shape == source.shape and out.dtype == source.dtype:
+        np.copyto(out, source)
+        image = out
+    else:
+        image = source.copy()
     for detection_result in result.det_results:
         image = visualise(
             image,
             detection_result.finder_result,
             detection_result.ext_results,
             show_debug_boxes,
+            copy=False,
         )
     return image
 
@@ -124,8 +475,10 @@ def visualise(
     finder_result: base.FinderResult,
     extractor_results: list[base.ExtractorResult],
     show_debug_boxes=False,
+    copy: bool = True,
 ) -> NDArray:
-    image = image.copy()
+    if copy:
+        image = image.copy()
     if show_debug_boxes:
         debug_box = finder_result.box
         cv2.rectangle(
@@ -0,0 +1,321 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, Optional, TextIO
+import csv
+import itertools
+import re
+import sys
+
+import cv2
+from numpy.typing import NDArray
+
+from . import base
+from .detection import YoloPlateDetectionModel
+from .preprocessor import get_preprocessor
+from .threads import apply_thread_settings, default_thread_settings
+
+
+@dataclass(frozen=True)
+class EvaluationSettings:
+    original_preprocessor: str
+    plate_preprocessor: str
+    required_confidence: float
+    image_size: Optional[int]
+    ocr_decoder: str
+
+
+@dataclass
+class EvaluationResult:
+    settings: EvaluationSettings
+    frames: int
+    plates: int
+    exact_matches: int
+    character_accuracy: float
+    fps: float
+    pareto_optimal: bool = False
+
+    @property
+    def exact_match_accuracy(self) -> float:
+        return self.exact_matches / self.plates if self.plates else 0.0
+
+
+def make_grid(
+    original_preprocessors: list[str],
+    plate_preprocessors: list[str],
+    required_confidences: list[float],
+    image_sizes: list[Optional[int]],
+    ocr_decoders: list[str],
+) -> list[EvaluationSettings]:
+    return [
+        EvaluationSettings(*values)
+        for values in itertools.product(
+            original_preprocessors,
+            plate_preprocessors,
+            required_confidences,
+            image_sizes,
+            ocr_decoders,
+        )
+    ]
+
+
+def normalise_plate(text: str) -> str:
+    return re.sub(r"[^0-9A-Z]", "", text.upper())
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def character_accuracy(expected: str, predicted: str) -> float:
+    if not expected:
+        return float(not predicted)
+    return max(0.0, 1 - edit_distance(expected, predicted) / len(expected))
+
+
+def read_plates(results: base.DetectionResults) -> list[str]:
+    out = []
+    for detection_result in results.det_results:
+        ext_results = sorted(detection_result.ext_results, key=lambda x: x.box[0][0])
+        out.append(normalise_plate("".join(r.text for r in ext_results)))
+    return out
+
+
+def score_frame(expected: list[str], predicted: list[str]) -> tuple[int, float]:
+    """Greedily pairs every expected plate with its closest unused reading."""
+    exact_matches = 0
+    accuracy_sum = 0.0
+    unused = list(predicted)
+    for plate in map(normalise_plate, expected):
+        if not unused:
+            continue
+        best = max(unused, key=lambda p: character_accuracy(plate, p))
+        unused.remove(best)
+        exact_matches += best == plate
+        accuracy_sum += character_accuracy(plate, best)
+    return exact_matches, accuracy_sum
+
+
+def load_model(
+    settings: EvaluationSettings,
+    yolo_weights_path: Path,
+    text_allow_list: Optional[str],
+) -> YoloPlateDetectionModel:
+    return YoloPlateDetectionModel(
+        yolo_weights_path=yolo_weights_path,
+        original_frame_preprocessor=get_preprocessor(settings.original_preprocessor),
+        license_plate_preprocessor=get_preprocessor(settings.plate_preprocessor),
+        text_allow_list=text_allow_list,
+        required_confidence=settings.required_confidence,
+        image_size=settings.image_size,
+        ocr_decoder=settings.ocr_decoder,
+    )
+
+
+def iter_frames(
+    samples: list[tuple[Path, list[str]]]
+) -> Iterator[tuple[NDArray, list[str]]]:
+    """Decodes the frames one at a time, so a worker holds a single frame."""
+    for path, plates in samples:
+        image = cv2.imread(str(path))
+        if image is not None:
+            yield image, plates
+
+
+def measure_accuracy(
+    settings: EvaluationSettings,
+    yolo_weights_path: Path,
+    text_allow_list: Optional[str],
+    samples: list[tuple[Path, list[str]]],
+) -> EvaluationResult:
+    model = load_model(settings, yolo_weights_path, text_allow_list)
+    frames = 0
+    plates_total = 0
+    exact_matches = 0
+    accuracy_sum = 0.0
+    for image, expected in iter_frames(samples):
+        matches, accuracy = score_frame(
+            expected, read_plates(model.detect_plates(image))
+        )
+        frames += 1
+        plates_total += len(expected)
+        exact_matches += matches
+        accuracy_sum += accuracy
+
+    return EvaluationResult(
+        settings=settings,
+        frames=frames,
+        plates=plates_total,
+        exact_matches=exact_matches,
+        character_accuracy=accuracy_sum / plates_total if plates_total else 0.0,
+        fps=0.0,
+    )
+
+
+def measure_throughput(
+    settings: EvaluationSettings,
+    yolo_weights_path: Path,
+    text_allow_list: Optional[str],
+    samples: list[tuple[Path, list[str]]],
+) -> float:
+    model = load_model(settings, yolo_weights_path, text_allow_list)
+    frames = 0
+    elapsed = 0.0
+    for image, _ in iter_frames(samples):
+        if frames == 0:
+            model.detect_plates(image)  # warm-up, excluded from timing
+        frames += 1
+        start = perf_counter()
+        model.detect_plates(image)
+        elapsed += perf_counter() - start
+    return frames / elapsed if elapsed > 0 else 0.0
+
+
+def mark_pareto_optimal(results: list[EvaluationResult]):
+    for result in results:
+        result.pareto_optimal = not any(
+            other.exact_match_accuracy >= result.exact_match_accuracy
+            and other.fps >= result.fps
+            and (
+                other.exact_match_accuracy > result.exact_match_accuracy
+                or other.fps > result.fps
+            )
+            for other in results
+        )
+
+
+def fastest_meeting_target(
+    results: list[EvaluationResult], target_accuracy: float
+) -> Optional[EvaluationResult]:
+    meeting = [r for r in results if r.exact_match_accuracy >= target_accuracy]
+    return max(meeting, key=lambda r: r.fps, default=None)
+
+
+def run_evaluation(
+    grid: list[EvaluationSettings],
+    yolo_weights_path: Path,
+    text_allow_list: Optional[str],
+    samples: list[tuple[Path, list[str]]],
+    workers: int,
+    timing_frames: Optional[int] = None,
+) -> list[EvaluationResult]:
+    """Measures accuracy in `workers` processes at once, then throughput one
+    configuration at a time, so the timed configurations do not compete for
+    the CPU or GPU."""
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=apply_thread_settings,
+        initargs=(default_thread_settings(workers),),
+    ) as executor:
+        futures = [
+            executor.submit(
+                measure_accuracy, settings, yolo_weights_path, text_allow_list, samples
+            )
+            for settings in grid
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            print(f"\rAccuracy {i}/{len(grid)}", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    with ProcessPoolExecutor(
+        max_workers=1,
+        initializer=apply_thread_settings,
+        initargs=(default_thread_settings(1),),
+    ) as executor:
+        for i, result in enumerate(results, 1):
+            result.fps = executor.submit(
+                measure_throughput,
+                result.settings,
+                yolo_weights_path,
+                text_allow_list,
+                samples[:timing_frames],
+            ).result()
+            print(f"\rThroughput {i}/{len(grid)}", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    mark_pareto_optimal(results)
+    return sorted(results, key=lambda r: r.fps, reverse=True)
+
+
+def print_table(
+    results: list[EvaluationResult],
+    target_accuracy: Optional[float] = None,
+    output: TextIO = sys.stdout,
+):
+    chosen = (
+        fastest_meeting_target(results, target_accuracy)
+        if target_accuracy is not None
+        else None
+    )
+    header = (
+        "original",
+        "plate",
+        "req_conf",
+        "imgsz",
+        "decoder",
+        "exact",
+        "char",
+        "fps",
+        "",
+    )
+    rows = [header]
+    for r in results:
+        s = r.settings
+        marker = "*" if r.pareto_optimal else ""
+        if r is chosen:
+            marker += " <- fastest >= target"
+        rows.append(
+            (
+                s.original_preprocessor,
+                s.plate_preprocessor,
+                f"{s.required_confidence:.2f}",
+                str(s.image_size) if s.image_size is not None else "default",
+                s.ocr_decoder,
+                f"{r.exact_match_accuracy:.3f}",
+                f"{r.character_accuracy:.3f}",
+                f"{r.fps:.2f}",
+                marker,
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    for row in rows:
+        print("  ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip(), file=output)
+    print("* Pareto-optimal (exact-match accuracy vs FPS)", file=output)
+    if target_accuracy is not None and chosen is None:
+        print(f"No configuration reaches accuracy {target_accuracy}.", file=output)
+
+
+def write_csv(results: list[EvaluationResult], path: Path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            list(asdict(results[0].settings).keys())
+            + ["frames", "plates", "exact", "char", "fps", "pareto_optimal"]
+        )
+        for r in results:
+            writer.writerow(
+                list(asdict(r.settings).values())
+                + [
+                    r.frames,
+                    r.plates,
+                    r.exact_match_accuracy,
+                    r.character_accuracy,
+                    r.fps,
+                    r.pareto_optimal,
+                ]
+            )
@@ -0,0 +1,245 @@
+import ast
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from time import monotonic
+from typing import Any, Iterable, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as e:
+    raise ImportError(
+        "Parquet export needs pyarrow: pip install 'LicensePlateRecognition[parquet]'"
+    ) from e
+
+from .logger import LOG_FILENAME, find_camera_roots, iter_log_entries
+from .sinks import EventSink
+
+SCHEMA = pa.schema(
+    [
+        ("record", pa.string()),
+        ("time", pa.timestamp("us")),
+        ("fps", pa.float32()),
+        ("plate", pa.int32()),
+        ("confidence", pa.float32()),
+        ("x1", pa.int32()),
+        ("y1", pa.int32()),
+        ("x2", pa.int32()),
+        ("y2", pa.int32()),
+        ("read", pa.bool_()),
+        ("text", pa.string()),
+        ("text_confidence", pa.float32()),
+        ("texts", pa.list_(pa.string())),
+        ("text_confidences", pa.list_(pa.float32())),
+        ("text_boxes", pa.list_(pa.list_(pa.int32()))),
+        ("original_image", pa.string()),
+        ("marked_image", pa.string()),
+        ("plate_image", pa.string()),
+        ("augmented_plate_image", pa.string()),
+    ]
+)
+TEXT_COLUMNS = ("text", "text_confidence", "texts", "text_confidences", "text_boxes")
+
+
+def parse_box(box: str | list) -> list[int]:
+    """Flattens a box, also from the `str(box)` form of older logs."""
+    if isinstance(box, str):
+        box = ast.literal_eval(box)
+    out = []
+    for value in box:
+        if isinstance(value, (list, tuple)):
+            out.extend(int(v) for v in value)
+        else:
+            out.append(int(value))
+    return out
+
+
+def text_columns(readings: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "text": " ".join(r["text"] for r in readings) if readings else None,
+        "text_confidence": min(r["confidence"] for r in readings) if readings else None,
+        "texts": [r["text"] for r in readings],
+        "text_confidences": [r["confidence"] for r in readings],
+        "text_boxes": [parse_box(r["box"]) for r in readings],
+    }
+
+
+def entry_rows(entry: dict[str, Any]) -> list[dict[str, Any]]:
+    """One row per plate of a detection log entry or deferred OCR update."""
+    time = datetime.fromisoformat(entry["time"])
+    if entry.get("type") == "ocr_update":
+        return [
+            {
+                "record": "ocr_update",
+                "time": time,
+                "plate": entry["plate"],
+                "read": True,
+                **text_columns(entry["detected"]),
+            }
+        ]
+    if "type" in entry:
+        return []
+
+    rows = []
+    for i, plate in enumerate(entry.get("detected", [])):
+        x1, y1, x2, y2 = parse_box(plate["box"])
+        rows.append(
+            {
+                "record": "detection",
+                "time": time,
+                "fps": entry.get("FPS"),
+                "plate": i,
+                "confidence": plate["confidence"],
+                "x1": x1,
+                "y1": y1,
+                "x2": x2,
+                "y2": y2,
+                "read": plate.get("read", True),
+                **text_columns(plate["detected"]),
+                "original_image": entry.get("original_image"),
+                "marked_image": entry.get("marked_image"),
+                "plate_image": plate.get("plate_image"),
+                "augmented_plate_image": plate.get("augmented_plate_image"),
+            }
+        )
+    return rows
+
+
+def partition_path(root: Path, instance: str, camera: str, day: str) -> Path:
+    return root / f"instance={instance}" / f"camera={camera}" / f"date={day}"
+
+
+def _part_name(stamp: Optional[str] = None, suffix: Optional[str] = None) -> str:
+    stamp = stamp or datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    return f"part-{stamp}-{suffix or uuid.uuid4().hex[:8]}.parquet"
+
+
+def _write_table(rows: list[dict[str, Any]], path: Path):
+    tmp_path = path.with_name(path.name + ".tmp")
+    pq.write_table(pa.Table.from_pylist(rows, schema=SCHEMA), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def append_rows(
+    root: Path, instance: str, camera: str, rows: Iterable[dict[str, Any]]
+) -> set[Path]:
+    """Writes the rows as a new file in each day partition they fall in and
+    returns the partitions written to."""
+    by_day: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        by_day.setdefault(row["time"].date().isoformat(), []).append(row)
+    written = set()
+    for day, day_rows in by_day.items():
+        partition = partition_path(root, instance, camera, day)
+        partition.mkdir(parents=True, exist_ok=True)
+        _write_table(day_rows, partition / _part_name())
+        written.add(partition)
+    return written
+
+
+def merge_rows(rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keeps the last row of each plate and folds OCR updates into the plates
+    they complete. Updates whose plate is not there are kept as they are."""
+    detections: dict[tuple[datetime, int], dict[str, Any]] = {}
+    updates: dict[tuple[datetime, int], dict[str, Any]] = {}
+    for row in rows:
+        key = (row["time"], row["plate"])
+        if row["record"] == "ocr_update":
+            updates[key] = row
+        else:
+            detections[key] = row
+    for key, update in list(updates.items()):
+        if key in detections:
+            detections[key].update({c: update[c] for c in TEXT_COLUMNS}, read=True)
+            del updates[key]
+    return sorted(
+        [*detections.values(), *updates.values()],
+        key=lambda r: (r["time"], r["plate"]),
+    )
+
+
+def compact_partition(partition: Path):
+    """Merges the files of a partition into one, named after the newest merged
+    file so files appended meanwhile still sort after it."""
+    parts = sorted(partition.glob("part-*.parquet"))
+    if len(parts) < 2:
+        return
+    rows = []
+    for part in parts:  # oldest first, so later rows win
+        rows.extend(pq.read_table(part, schema=SCHEMA).to_pylist())
+    compacted = partition / _part_name(parts[-1].name.split("-")[1], "compacted")
+    _write_table(merge_rows(rows), compacted)
+    for part in parts:
+        if part != compacted:
+            part.unlink()
+
+
+def export_logs(
+    paths: list[Path],
+    output: Path,
+    instance: str,
+    batch_rows: int = 100000,
+) -> int:
+    """Exports detection logs, leaving one compacted file per partition.
+    Exporting the same logs again replaces their rows instead of duplicating
+    them, and rows of days no longer in the logs are kept."""
+    exported = 0
+    for camera_root in find_camera_roots(paths):
+        touched: set[Path] = set()
+        rows: list[dict[str, Any]] = []
+        for entry in iter_log_entries(camera_root / LOG_FILENAME):
+            try:
+                rows.extend(entry_rows(entry))
+            except (KeyError, ValueError, SyntaxError) as e:
+                print(f"Skipping malformed entry in {camera_root}: {e}")
+            if len(rows) >= batch_rows:
+                touched |= append_rows(output, instance, camera_root.name, rows)
+                exported += len(rows)
+                rows = []
+        touched |= append_rows(output, instance, camera_root.name, rows)
+        exported += len(rows)
+        for partition in sorted(touched):
+            compact_partition(partition)
+    return exported
+
+
+class ParquetSink(EventSink):
+    """Continuously appends detection events to a partitioned Parquet dataset
+    and compacts the partitions it wrote to every `compact_interval` seconds.
+    It is given the name of its instance in the configuration, which export
+    takes as --instance, so both write to the same partitions."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        instance: str,
+        spool_path: Path,
+        compact_interval: float = 3600.0,
+        **kwargs,
+    ):
+        super().__init__(spool_path, **kwargs)
+        self.root = Path(root)
+        self.instance = instance
+        self.compact_interval = compact_interval
+        self._touched: set[Path] = set()
+        self._last_compaction = monotonic()
+
+    def send(self, events: list[dict[str, Any]]) -> None:
+        by_camera: dict[str, list[dict[str, Any]]] = {}
+        for event in events:
+            by_camera.setdefault(event["logger_name"], []).extend(entry_rows(event))
+        for camera, rows in by_camera.items():
+            self._touched |= append_rows(self.root, self.instance, camera, rows)
+        if monotonic() - self._last_compaction >= self.compact_interval:
+            self.compact()
+
+    def compact(self):
+        for partition in sorted(self._touched):
+            compact_partition(partition)
+        self._touched.clear()
+        self._last_compaction = monotonic()
+
+    def close(self) -> None:
+        self.compact()
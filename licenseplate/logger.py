@@ -1,6 +1,19 @@
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Iterator, Optional
+import gzip
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import shutil
+import threading
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
 
 
 def get_standard_logger(name: str, output) -> logging.Logger:
@@ -12,32 +25,188 @@ def get_standard_logger(name: str, output) -> logging.Logger:
 
     detection_logger_handler.setFormatter(None)
 
+    for handler in list(detection_logger.handlers):
+        detection_logger.removeHandler(handler)
     detection_logger.addHandler(detection_logger_handler)
     return detection_logger
 
 
+@dataclass
+class LogRotation:
+    max_bytes: int = 0
+    when: Optional[str] = None
+    interval: int = 1
+    backup_count: int = 5
+    compress: bool = False
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def make_file_handler(log_path: Path, rotation: LogRotation) -> logging.Handler:
+    handler: logging.FileHandler
+    if rotation.when is not None:
+        handler = TimedRotatingFileHandler(
+            log_path,
+            when=rotation.when,
+            interval=rotation.interval,
+            backupCount=rotation.backup_count,
+        )
+    else:
+        handler = RotatingFileHandler(
+            log_path, maxBytes=rotation.max_bytes, backupCount=rotation.backup_count
+        )
+    if rotation.compress:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+class _RoutingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.routes: dict[str, logging.Handler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        handler = self.routes.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+
+
+class _LogWriter:
+    """A single thread writing the records of all queue-backed loggers."""
+
+    def __init__(self):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.router = _RoutingHandler()
+        self.listener: Optional[QueueListener] = None
+        self.lock = threading.Lock()
+
+    def add(self, name: str, handler: logging.Handler):
+        with self.lock:
+            self.router.routes[name] = handler
+            if self.listener is None:
+                self.listener = QueueListener(self.queue, self.router)
+                self.listener.start()
+
+    def remove(self, name: str) -> Optional[logging.Handler]:
+        with self.lock:
+            if name not in self.router.routes:
+                return None
+            if self.listener is not None:
+                self.listener.stop()  # flushes queued records
+                self.listener = None
+            handler = self.router.routes.pop(name, None)
+            if self.router.routes:
+                self.listener = QueueListener(self.queue, self.router)
+                self.listener.start()
+            return handler
+
+
+_writer = _LogWriter()
+
+
 def get_rotating_logger(
     name: str,
     log_dir: Path,
     log_filename: str,
     level=logging.DEBUG,
-    max_bytes: int = 1024 * 1024,
-    backup_count: int = 5,
-):
+    rotation: Optional[LogRotation] = None,
+) -> logging.Logger:
+    """Returns a logger whose records are written off the calling thread.
+
+    Calling it again with the same name replaces the previous file handler."""
     logger = logging.getLogger(name)
     logger.setLevel(level)
+    logger.propagate = False
 
     log_dir.mkdir(exist_ok=True, parents=True)
 
-    log_path = log_dir / log_filename
-
-    handler = RotatingFileHandler(
-        log_path, maxBytes=max_bytes, backupCount=backup_count
+    close_logger(name)
+    handler = make_file_handler(
+        log_dir / log_filename, rotation if rotation is not None else LogRotation()
     )
     handler.setLevel(level)
-    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(message)s"))
-
-    if not logger.handlers:
-        logger.addHandler(handler)
+    _writer.add(name, handler)
 
+    logger.addHandler(QueueHandler(_writer.queue))
     return logger
+
+
+def close_logger(name: str):
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = _writer.remove(name)
+    if handler is not None:
+        handler.close()
+
+
+LOG_FILENAME = "detected-plates.log"
+
+
+def find_camera_roots(paths: list[Path]) -> list[Path]:
+    """Directories holding a detection log, from camera or logging roots."""
+    roots = []
+    for path in paths:
+        if (path / LOG_FILENAME).exists():
+            roots.append(path)
+        else:
+            roots.extend(sorted(log.parent for log in path.rglob(LOG_FILENAME)))
+    return roots
+
+
+def log_files(log_path: Path) -> list[Path]:
+    """The current log file and its rotated backups, oldest first."""
+    rotated = [p for p in log_path.parent.glob(log_path.name + ".*") if p.is_file()]
+    rotated.sort(key=lambda p: p.stat().st_mtime)
+    if log_path.exists():
+        rotated.append(log_path)
+    return rotated
+
+
+def iter_log_entries(log_path: Path) -> Iterator[dict[str, Any]]:
+    """Reads back the entries of a detection log, including rotated and
+    compressed backups, line by line. Entries of the older indented format,
+    from a line '{' to a line '}', are collected before decoding."""
+    for path in log_files(log_path):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt") as f:
+            pending: list[str] = []
+            for number, line in enumerate(f, 1):
+                if line.startswith("{"):
+                    if pending:
+                        print(f"Skipping unreadable log data in {path}:{number}.")
+                        pending = []
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        pending = [line]  # start of an indented entry
+                        continue
+                elif pending:
+                    pending.append(line)
+                    if line.rstrip() != "}":
+                        continue
+                    try:
+                        entry = json.loads("".join(pending))
+                    except json.JSONDecodeError:
+                        print(f"Skipping unreadable log data in {path}:{number}.")
+                        continue
+                    finally:
+                        pending = []
+                else:
+                    if line.strip():
+                        print(f"Skipping unreadable log data in {path}:{number}.")
+                    continue
+                if isinstance(entry, dict):
+                    yield entry
+            if pending:
+                print(f"Skipping unreadable log data at the end of {path}.")
@@ -1,9 +1,11 @@
 import signal
 from time import sleep
+from datetime import timedelta
 from typing import Optional, Any
 from pathlib import Path
 from argparse import ArgumentParser
 import string
+import tempfile
 
 import yaml
 from pydantic import BaseModel
@@ -12,6 +14,18 @@ from . import base
 from . import action
 from . import detection
 from . import preprocessor
+from . import dataset
+from . import evaluation
+from . import remote
+from . import sinks as sinks_module
+from . import logger
+from . import retention as retention_module
+from . import threads as threads_module
+from . import tracing as tracing_module
+from . import reocr
+from . import preview as preview_module
+from . import capacity
+from . import deferred
 
 
 class CameraConfig(BaseModel):
@@ -20,11 +34,20 @@ class CameraConfig(BaseModel):
 
     class _DefaultCameraArgs(BaseModel):
         device: int = 0
+        buffer_count: int = 2
 
     class _RaspberryCameraArgs(BaseModel):
         height: int = 1920
         width: int = 1080
         buffer_count: int = 4
+        # both set: detection runs on a lores_width x lores_height stream
+        lores_height: Optional[int] = None
+        lores_width: Optional[int] = None
+
+    class _SyntheticCameraArgs(BaseModel):
+        image_dir: str
+        fps: float = 10.0
+        max_images: int = 50
 
     def make(self) -> base.CameraInterface:
         kwargs = self.kwargs if self.kwargs is not None else {}
@@ -32,33 +55,72 @@ class CameraConfig(BaseModel):
             kwargs_parsed = self._DefaultCameraArgs.model_validate(kwargs)
             from .camera.default import DefaultCameraInterface
 
-            return DefaultCameraInterface(kwargs_parsed.device)
+            return DefaultCameraInterface(
+                kwargs_parsed.device, kwargs_parsed.buffer_count
+            )
         elif self.camera_interface.strip() == "raspberry":
             kwargs_parsed = self._RaspberryCameraArgs.model_validate(kwargs)
             from .camera.raspberry import RaspberryCameraInterface
 
+            lores_dim = None
+            if (
+                kwargs_parsed.lores_height is not None
+                and kwargs_parsed.lores_width is not None
+            ):
+                lores_dim = (kwargs_parsed.lores_width, kwargs_parsed.lores_height)
+
             return RaspberryCameraInterface(
-                (kwargs_parsed.height, kwargs_parsed.width), kwargs_parsed.buffer_count
+                (kwargs_parsed.height, kwargs_parsed.width),
+                kwargs_parsed.buffer_count,
+                lores_dim,
+            )
+        elif self.camera_interface.strip() == "synthetic":
+            kwargs_parsed = self._SyntheticCameraArgs.model_validate(kwargs)
+            from .camera.synthetic import SyntheticCameraInterface
+
+            return SyntheticCameraInterface(
+                Path(kwargs_parsed.image_dir),
+                kwargs_parsed.fps,
+                kwargs_parsed.max_images,
             )
         else:
-            raise ValueError("Available camera interfaces: [default, raspberry]")
+            raise ValueError(
+                "Available camera interfaces: [default, raspberry, synthetic]"
+            )
+
+
+class DeferredOcrConfig(BaseModel):
+    cpu_ceiling: float = 0.5
+    poll_interval: float = 0.5
+    retry_interval: float = 10.0
+    max_attempts: int = 5
+
+    def make(self) -> deferred.DeferredOcrSettings:
+        return deferred.DeferredOcrSettings(**self.model_dump())
 
 
 class LocalSaveCameraConfig(BaseModel):
     camera: CameraConfig
     max_fps: int = 30
+    cpu_affinity: Optional[list[int]] = None
     show_debug_boxes: Optional[bool] = None
     log_cropped_plates: Optional[bool] = None
     log_augmented_plates: Optional[bool] = None
+    # only find plates in the loop, the instance's deferred OCR reads them
+    deferred_ocr: Optional[bool] = None
 
     def make(
-        self, name: str, detection_model: detection.YoloPlateDetectionModel
+        self,
+        name: str,
+        detection_model: base.PlateDetectionModel,
+        preview_channel: Optional[preview_module.PreviewChannel] = None,
     ) -> action.LocalSaveManagerArguments:
         return action.LocalSaveManagerArguments(
             name=name,
             detection_model=detection_model,
             camera=self.camera.make(),
             max_fps=self.max_fps,
+            cpu_affinity=self.cpu_affinity,
             show_debug_boxes=self.show_debug_boxes
             if self.show_debug_boxes is not None
             else False,
@@ -68,48 +130,313 @@ class LocalSaveCameraConfig(BaseModel):
             log_augmented_plates=self.log_augmented_plates
             if self.log_augmented_plates is not None
             else False,
+            preview=preview_channel,
+            deferred_ocr=self.deferred_ocr if self.deferred_ocr is not None else False,
         )
 
 
-class LocalSaveConfig(BaseModel):
-    yolo_weights_path: str
-    original_preprocessor: str
-    plate_preprocessor: str
-    text_allow_list: str | None
-    required_confidence: float = 0.5
-    logging_root: str
-    cameras: dict[str, LocalSaveCameraConfig]
+class ThreadsConfig(BaseModel):
+    torch_intra_op_threads: Optional[int] = None
+    torch_inter_op_threads: Optional[int] = None
+    opencv_threads: Optional[int] = None
+
+    def make(self) -> threads_module.ThreadSettings:
+        return threads_module.ThreadSettings(**self.model_dump())
+
+
+class TracingConfig(BaseModel):
+    path: str
+    sample_rate: float = 1.0
+    max_buffered_events: int = 100000
+
+    def start(self):
+        tracing_module.start_tracing(
+            Path(self.path), self.sample_rate, self.max_buffered_events
+        )
+
+
+class FinderGatesConfig(BaseModel):
+    min_confidence: Optional[float] = None
+    nms_iou: Optional[float] = None
+    max_detections: Optional[int] = None
+    min_width: int = 0
+    min_height: int = 0
+    min_aspect_ratio: Optional[float] = None
+    max_aspect_ratio: Optional[float] = None
+    top_k: Optional[int] = None
+
+    def make(self) -> detection.FinderGates:
+        return detection.FinderGates(**self.model_dump())
 
-    def make(self) -> action.LocalSaveManager:
-        detection_model = detection.YoloPlateDetectionModel(
+
+class DetectionModelConfig(BaseModel):
+    yolo_weights_path: Optional[str] = None
+    original_preprocessor: str = "identity"
+    plate_preprocessor: str = "black_and_white"
+    text_allow_list: str | None = None
+    required_confidence: float = 0.5
+    image_size: Optional[int] = None
+    ocr_decoder: str = "beamsearch"
+    detection_width: Optional[int] = None
+    finder_gates: Optional[FinderGatesConfig] = None
+    ocr_time_budget: Optional[float] = None
+    ocr_cache_size: Optional[int] = None
+    ocr_cache_ttl: float = 30.0
+    ocr_cache_max_distance: float = 0.0
+
+    def make_model(self) -> detection.YoloPlateDetectionModel:
+        if self.yolo_weights_path is None:
+            raise ValueError("yolo_weights_path is required for local detection.")
+        return detection.YoloPlateDetectionModel(
             yolo_weights_path=Path(self.yolo_weights_path).resolve(),
-            original_frame_preprocessor=get_preprocessor(self.original_preprocessor),
-            license_plate_preprocessor=get_preprocessor(self.plate_preprocessor),
+            original_frame_preprocessor=preprocessor.get_preprocessor(
+                self.original_preprocessor
+            ),
+            license_plate_preprocessor=preprocessor.get_preprocessor(
+                self.plate_preprocessor
+            ),
             text_allow_list=self.text_allow_list,
             required_confidence=self.required_confidence,
+            image_size=self.image_size,
+            ocr_decoder=self.ocr_decoder,
+            detection_width=self.detection_width,
+            finder_gates=self.finder_gates.make()
+            if self.finder_gates is not None
+            else None,
+            ocr_time_budget=self.ocr_time_budget,
+            ocr_cache_size=self.ocr_cache_size,
+            ocr_cache_ttl=self.ocr_cache_ttl,
+            ocr_cache_max_distance=self.ocr_cache_max_distance,
         )
+
+
+class RemoteDetectionConfig(BaseModel):
+    url: str
+    payload: str = "jpeg"
+    jpeg_quality: int = 90
+    timeout: float = 5.0
+    pool_size: int = 4
+
+    def make(self) -> remote.RemoteDetectionModel:
+        return remote.RemoteDetectionModel(
+            url=self.url,
+            payload=self.payload,
+            jpeg_quality=self.jpeg_quality,
+            timeout=self.timeout,
+            pool_size=self.pool_size,
+        )
+
+
+class SinkConfig(BaseModel):
+    sink: str
+    kwargs: Optional[dict[str, Any]] = None
+    batch_size: int = 50
+    batch_interval: float = 1.0
+    retry_interval: float = 5.0
+    max_pending: int = 10000
+
+    class _WebhookSinkArgs(BaseModel):
+        url: str
+        timeout: float = 5.0
+        headers: Optional[dict[str, str]] = None
+
+    class _ParquetSinkArgs(BaseModel):
+        root: str
+        compact_interval: float = 3600.0
+
+    class _MqttSinkArgs(BaseModel):
+        host: str
+        port: int = 1883
+        topic: str = "licenseplate/detections"
+        qos: int = 1
+        timeout: float = 5.0
+        username: Optional[str] = None
+        password: Optional[str] = None
+
+    def make(self, spool_path: Path, instance: str) -> sinks_module.EventSink:
+        kwargs = self.kwargs if self.kwargs is not None else {}
+        batching = dict(
+            spool_path=spool_path,
+            batch_size=self.batch_size,
+            batch_interval=self.batch_interval,
+            retry_interval=self.retry_interval,
+            max_pending=self.max_pending,
+        )
+        if self.sink.strip() == "webhook":
+            kwargs_parsed = self._WebhookSinkArgs.model_validate(kwargs)
+            return sinks_module.WebhookSink(**kwargs_parsed.model_dump(), **batching)
+        elif self.sink.strip() == "mqtt":
+            kwargs_parsed = self._MqttSinkArgs.model_validate(kwargs)
+            return sinks_module.MqttSink(**kwargs_parsed.model_dump(), **batching)
+        elif self.sink.strip() == "parquet":
+            kwargs_parsed = self._ParquetSinkArgs.model_validate(kwargs)
+            from .export import ParquetSink
+
+            return ParquetSink(
+                **kwargs_parsed.model_dump(), instance=instance, **batching
+            )
+        else:
+            raise ValueError("Available sinks: [webhook, mqtt, parquet]")
+
+
+class LogRotationConfig(BaseModel):
+    max_bytes: int = 0
+    when: Optional[str] = None
+    interval: int = 1
+    backup_count: int = 5
+    compress: bool = False
+
+    def make(self) -> logger.LogRotation:
+        return logger.LogRotation(**self.model_dump())
+
+
+class RetentionConfig(BaseModel):
+    camera_max_bytes: Optional[int] = None
+    total_max_bytes: Optional[int] = None
+    pack_window_minutes: int = 60
+    pack_delay_minutes: int = 1
+    interval: float = 300.0
+    policy: str = "delete"
+    downsample_scale: float = 0.5
+    downsample_quality: int = 60
+
+    def make(self) -> retention_module.RetentionPolicy:
+        if self.policy not in ("delete", "downsample"):
+            raise ValueError("Retention policies allowed: [delete, downsample].")
+        return retention_module.RetentionPolicy(
+            camera_max_bytes=self.camera_max_bytes,
+            total_max_bytes=self.total_max_bytes,
+            pack_window=timedelta(minutes=self.pack_window_minutes),
+            pack_delay=timedelta(minutes=self.pack_delay_minutes),
+            interval=self.interval,
+            policy=self.policy,
+            downsample_scale=self.downsample_scale,
+            downsample_quality=self.downsample_quality,
+        )
+
+
+class LocalSaveConfig(DetectionModelConfig):
+    detection_server: Optional[RemoteDetectionConfig] = None
+    logging_root: str
+    cameras: dict[str, LocalSaveCameraConfig]
+    sinks: Optional[dict[str, SinkConfig]] = None
+    log_rotation: Optional[LogRotationConfig] = None
+    # reads the plates the cameras leave unread, in deferred mode or when the
+    # OCR time budget runs out
+    deferred_ocr: Optional[DeferredOcrConfig] = None
+
+    def make(
+        self, name: str, preview_server: Optional[preview_module.PreviewServer] = None
+    ) -> action.LocalSaveManager:
+        if self.deferred_ocr is None and any(
+            camera.deferred_ocr for camera in self.cameras.values()
+        ):
+            raise ValueError(f"Instance {name} defers OCR without deferred_ocr.")
+        if self.detection_server is not None:
+            detection_model: base.PlateDetectionModel = self.detection_server.make()
+        else:
+            detection_model = self.make_model()
         parsed_cameras = [
-            camera.make(name, detection_model) for name, camera in self.cameras.items()
+            camera.make(
+                camera_name,
+                detection_model,
+                preview_server.add_channel(f"{name}/{camera_name}")
+                if preview_server is not None
+                else None,
+            )
+            for camera_name, camera in self.cameras.items()
+        ]
+        logging_root = Path(self.logging_root).resolve()
+        parsed_sinks = [
+            sink.make(logging_root / "spool" / f"{sink_name}.jsonl", name)
+            for sink_name, sink in (self.sinks or {}).items()
         ]
         return action.LocalSaveManager(
-            cameras=parsed_cameras, logging_root=Path(self.logging_root).resolve()
+            cameras=parsed_cameras,
+            logging_root=logging_root,
+            sinks=parsed_sinks,
+            log_rotation=self.log_rotation.make()
+            if self.log_rotation is not None
+            else None,
+            deferred_ocr=self.deferred_ocr.make()
+            if self.deferred_ocr is not None
+            else None,
         )
 
 
-class Config(BaseModel):
-    instances: dict[str, LocalSaveConfig]
+class ServerConfig(DetectionModelConfig):
+    # the server has no authentication, only listen beyond localhost on a
+    # trusted network
+    host: str = "127.0.0.1"
+    port: int = 8470
+    max_batch_size: int = 8
+    max_batch_delay: float = 0.01
+    threads: Optional[ThreadsConfig] = None
+    cpu_affinity: Optional[list[int]] = None
+
+    def make(self) -> remote.InferenceServer:
+        threads_module.apply_thread_settings(
+            threads_module.resolve_thread_settings(
+                self.threads.make() if self.threads is not None else None, 1
+            )
+        )
+        threads_module.pin_current_thread(self.cpu_affinity)
+        detector = remote.BatchingDetector(
+            self.make_model(), self.max_batch_size, self.max_batch_delay
+        )
+        return remote.InferenceServer((self.host, self.port), detector)
+
 
-    def make(self) -> dict[str, base.ManagerInterface]:
-        return {key: value.make() for key, value in self.instances.items()}
+class PreviewConfig(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = 8471
+    max_fps: float = 5.0
+    max_width: int = 640
+    jpeg_quality: int = 70
+
+    def make(self) -> preview_module.PreviewServer:
+        return preview_module.PreviewServer(
+            (self.host, self.port), self.max_fps, self.max_width, self.jpeg_quality
+        )
 
 
-def get_preprocessor(name: str) -> base.preprocessor_type:
-    if name == "identity":
-        return preprocessor.preprocess_identity
-    elif name == "black_and_white":
-        return preprocessor.preprocess_black_on_white
-    else:
-        raise ValueError("Preprocessors allowed: [identity, black_and_white].")
+class Config(BaseModel):
+    instances: dict[str, LocalSaveConfig]
+    threads: Optional[ThreadsConfig] = None
+    tracing: Optional[TracingConfig] = None
+    preview: Optional[PreviewConfig] = None
+    retention: Optional[RetentionConfig] = None
+
+    def thread_settings(self) -> threads_module.ThreadSettings:
+        local_cameras = sum(
+            len(instance.cameras)
+            for instance in self.instances.values()
+            if instance.detection_server is None
+        )
+        return threads_module.resolve_thread_settings(
+            self.threads.make() if self.threads is not None else None, local_cameras
+        )
+
+    def make(
+        self, preview_server: Optional[preview_module.PreviewServer] = None
+    ) -> dict[str, base.ManagerInterface]:
+        threads_module.apply_thread_settings(self.thread_settings())
+        return {
+            key: value.make(key, preview_server)
+            for key, value in self.instances.items()
+        }
+
+    def make_retention(self) -> Optional[retention_module.RetentionManager]:
+        """One manager over the cameras of all instances, so total_max_bytes
+        bounds them together."""
+        if self.retention is None:
+            return None
+        camera_roots = {
+            f"{key}/{camera_name}": Path(instance.logging_root).resolve() / camera_name
+            for key, instance in self.instances.items()
+            for camera_name in instance.cameras
+        }
+        return retention_module.RetentionManager(self.retention.make(), camera_roots)
 
 
 example_config = Config(
@@ -147,6 +474,18 @@ def main():
     run_subparser.add_argument(
         "configuration_file", type=Path, help="Configuration file."
     )
+    run_subparser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Write a Chrome trace of the pipeline stages to this file.",
+    )
+    run_subparser.add_argument(
+        "--trace-sample-rate",
+        type=float,
+        default=None,
+        help="Fraction of frames to trace (default: 1.0).",
+    )
 
     generate_subparser = subparsers.add_parser(
         "generate", help="Generate an example config file."
@@ -155,6 +494,163 @@ def main():
         "file_name", type=Path, help="File to save config to."
     )
 
+    serve_subparser = subparsers.add_parser(
+        "serve", help="Serve plate detection to remote cameras."
+    )
+    serve_subparser.add_argument(
+        "configuration_file", type=Path, help="Server configuration file."
+    )
+
+    evaluate_subparser = subparsers.add_parser(
+        "evaluate",
+        help="Measure plate-read accuracy and throughput over a grid of settings.",
+    )
+    evaluate_subparser.add_argument(
+        "dataset", type=Path, help="Directory with 'photos' and 'annotations.xml'."
+    )
+    evaluate_subparser.add_argument("weights", type=Path, help="YOLO weights.")
+    evaluate_subparser.add_argument(
+        "--original-preprocessor", nargs="+", default=["identity"]
+    )
+    evaluate_subparser.add_argument(
+        "--plate-preprocessor", nargs="+", default=["black_and_white"]
+    )
+    evaluate_subparser.add_argument(
+        "--required-confidence", nargs="+", type=float, default=[0.5]
+    )
+    evaluate_subparser.add_argument(
+        "--image-size",
+        nargs="+",
+        type=int,
+        default=[None],
+        help="YOLO input sizes (default: the model's own).",
+    )
+    evaluate_subparser.add_argument(
+        "--ocr-decoder",
+        nargs="+",
+        choices=["greedy", "beamsearch", "wordbeamsearch"],
+        default=["beamsearch"],
+    )
+    evaluate_subparser.add_argument(
+        "--text-allow-list", default=string.ascii_uppercase + string.digits
+    )
+    evaluate_subparser.add_argument(
+        "--limit", type=int, default=None, help="Use only the first N images."
+    )
+    evaluate_subparser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for the accuracy pass.",
+    )
+    evaluate_subparser.add_argument(
+        "--timing-frames",
+        type=int,
+        default=None,
+        help="Time each configuration on the first N images only.",
+    )
+    evaluate_subparser.add_argument(
+        "--target-accuracy",
+        type=float,
+        default=None,
+        help="Mark the fastest configuration reaching this exact-match accuracy.",
+    )
+    evaluate_subparser.add_argument(
+        "--csv", type=Path, default=None, help="Also save the results as CSV."
+    )
+
+    reocr_subparser = subparsers.add_parser(
+        "reocr",
+        help="Re-read logged plates from their saved crops with new OCR settings.",
+    )
+    reocr_subparser.add_argument(
+        "paths",
+        type=Path,
+        nargs="+",
+        help="Logging roots or camera directories with 'detected-plates.log'.",
+    )
+    reocr_subparser.add_argument("--plate-preprocessor", default="black_and_white")
+    reocr_subparser.add_argument(
+        "--text-allow-list", default=string.ascii_uppercase + string.digits
+    )
+    reocr_subparser.add_argument(
+        "--ocr-decoder",
+        choices=["greedy", "beamsearch", "wordbeamsearch"],
+        default="beamsearch",
+    )
+    reocr_subparser.add_argument("--required-confidence", type=float, default=0.5)
+    reocr_subparser.add_argument(
+        "--output-name",
+        default="reocr",
+        help="Readings go to '<camera directory>/<name>.jsonl'; reruns resume it.",
+    )
+    reocr_subparser.add_argument(
+        "--workers", type=int, default=1, help="Number of worker processes."
+    )
+    reocr_subparser.add_argument(
+        "--batch-size", type=int, default=32, help="Log entries per worker task."
+    )
+
+    capacity_subparser = subparsers.add_parser(
+        "capacity",
+        help="Run synthetic cameras through the pipeline and measure the load.",
+    )
+    capacity_subparser.add_argument(
+        "images", type=Path, help="Directory of frames (or a dataset with 'photos')."
+    )
+    capacity_subparser.add_argument("weights", type=Path, help="YOLO weights.")
+    capacity_subparser.add_argument("--cameras", type=int, default=1)
+    capacity_subparser.add_argument(
+        "--fps", type=float, default=10.0, help="Frame rate of each camera."
+    )
+    capacity_subparser.add_argument(
+        "--duration", type=float, default=60.0, help="Measured seconds."
+    )
+    capacity_subparser.add_argument(
+        "--warmup", type=float, default=10.0, help="Unmeasured seconds first."
+    )
+    capacity_subparser.add_argument("--sample-interval", type=float, default=5.0)
+    capacity_subparser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Track Python allocations with tracemalloc (slows the pipeline down).",
+    )
+    capacity_subparser.add_argument("--log-cropped-plates", action="store_true")
+    capacity_subparser.add_argument("--log-augmented-plates", action="store_true")
+    capacity_subparser.add_argument("--original-preprocessor", default="identity")
+    capacity_subparser.add_argument("--plate-preprocessor", default="black_and_white")
+    capacity_subparser.add_argument("--image-size", type=int, default=None)
+    capacity_subparser.add_argument("--detection-width", type=int, default=None)
+    capacity_subparser.add_argument("--ocr-time-budget", type=float, default=None)
+    capacity_subparser.add_argument(
+        "--logging-root",
+        type=Path,
+        default=None,
+        help="Where the cameras save detections (default: a temporary directory).",
+    )
+    capacity_subparser.add_argument(
+        "--report", type=Path, default=None, help="Also save the report as JSON."
+    )
+
+    export_subparser = subparsers.add_parser(
+        "export", help="Export detection logs as a partitioned Parquet dataset."
+    )
+    export_subparser.add_argument(
+        "paths",
+        type=Path,
+        nargs="+",
+        help="Logging roots or camera directories with 'detected-plates.log'.",
+    )
+    export_subparser.add_argument(
+        "--output", type=Path, required=True, help="Root of the Parquet dataset."
+    )
+    export_subparser.add_argument(
+        "--instance",
+        required=True,
+        help="Name of the instance in the configuration, as the parquet sink "
+        "names it.",
+    )
+
     args = parser.parse_args()
 
     if args.command == "generate":
@@ -167,15 +663,34 @@ def main():
         with open(args.configuration_file) as f:
             data = yaml.load(f, yaml.SafeLoader)
         global_config = Config.model_validate(data)
-
-        managers = global_config.make()
+        if args.trace is not None:
+            global_config.tracing = TracingConfig(path=str(args.trace))
+        if global_config.tracing is not None:
+            if args.trace_sample_rate is not None:
+                global_config.tracing.sample_rate = args.trace_sample_rate
+            global_config.tracing.start()
+
+        preview_server = (
+            global_config.preview.make() if global_config.preview is not None else None
+        )
+        managers = global_config.make(preview_server)
+        retention_manager = global_config.make_retention()
 
         for manager in managers.values():
             manager.start()
+        if retention_manager is not None:
+            retention_manager.start()
+        if preview_server is not None:
+            preview_server.start()
 
         def interrupt_handler(signum, frame):
+            if preview_server is not None:
+                preview_server.stop()
+            if retention_manager is not None:
+                retention_manager.stop()
             for m in managers.values():
                 m.stop()
+            tracing_module.stop_tracing()
             exit(0)
 
         signal.signal(signal.SIGINT, interrupt_handler)
@@ -184,6 +699,104 @@ def main():
         while True:
             sleep(1)
 
+    elif args.command == "serve":
+        with open(args.configuration_file) as f:
+            data = yaml.load(f, yaml.SafeLoader)
+        server = ServerConfig.model_validate(data).make()
+
+        def interrupt_handler(signum, frame):
+            exit(0)
+
+        signal.signal(signal.SIGTERM, interrupt_handler)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    elif args.command == "evaluate":
+        samples = dataset.load_ground_truth(args.dataset.resolve())[: args.limit]
+        grid = evaluation.make_grid(
+            args.original_preprocessor,
+            args.plate_preprocessor,
+            args.required_confidence,
+            args.image_size,
+            args.ocr_decoder,
+        )
+        results = evaluation.run_evaluation(
+            grid,
+            args.weights.resolve(),
+            args.text_allow_list,
+            samples,
+            args.workers,
+            args.timing_frames,
+        )
+        evaluation.print_table(results, args.target_accuracy)
+        if args.csv is not None:
+            evaluation.write_csv(results, args.csv)
+
+    elif args.command == "capacity":
+        images = args.images.resolve()
+        if (images / "photos").is_dir():
+            images = images / "photos"
+        threads_module.apply_thread_settings(
+            threads_module.default_thread_settings(args.cameras)
+        )
+        model = DetectionModelConfig(
+            yolo_weights_path=str(args.weights),
+            original_preprocessor=args.original_preprocessor,
+            plate_preprocessor=args.plate_preprocessor,
+            text_allow_list=string.ascii_uppercase + string.digits,
+            image_size=args.image_size,
+            detection_width=args.detection_width,
+            ocr_time_budget=args.ocr_time_budget,
+        ).make_model()
+        settings = capacity.CapacitySettings(
+            cameras=args.cameras,
+            fps=args.fps,
+            duration=args.duration,
+            warmup=args.warmup,
+            sample_interval=args.sample_interval,
+            trace_memory=args.trace_memory,
+            log_cropped_plates=args.log_cropped_plates,
+            log_augmented_plates=args.log_augmented_plates,
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            report = capacity.run_capacity_test(
+                model,
+                images,
+                (args.logging_root or Path(tmp)).resolve(),
+                settings,
+            )
+        capacity.print_report(report)
+        if args.report is not None:
+            capacity.write_report(report, args.report)
+
+    elif args.command == "export":
+        from .export import export_logs
+
+        exported = export_logs(
+            [path.resolve() for path in args.paths],
+            args.output.resolve(),
+            args.instance,
+        )
+        print(f"Exported {exported} rows to {args.output}.")
+
+    elif args.command == "reocr":
+        reocr.run_reocr(
+            [path.resolve() for path in args.paths],
+            reocr.ReocrSettings(
+                plate_preprocessor=args.plate_preprocessor,
+                text_allow_list=args.text_allow_list,
+                ocr_decoder=args.ocr_decoder,
+                required_confidence=args.required_confidence,
+            ),
+            output_name=args.output_name,
+            workers=args.workers,
+            batch_size=args.batch_size,
+        )
+
 
 if __name__ == "__main__":
     main()
@@ -2,14 +2,14 @@ import numpy as np
 from numpy.typing import NDArray
 import cv2
 
+from . import base
+
 
 def preprocess_identity(image: NDArray) -> NDArray:
-    return image.copy()
+    return image
 
 
 def preprocess_black_on_white(image: NDArray) -> NDArray:
-    image = image.copy()
-
     # image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     # image = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
     #                               cv2.THRESH_BINARY, 11, 2)
@@ -19,3 +19,12 @@ def preprocess_black_on_white(image: NDArray) -> NDArray:
     image = 255 - np.max(image, axis=2)
     _, image = cv2.threshold(image, 150, 255, cv2.THRESH_BINARY)
     return image
+
+
+def get_preprocessor(name: str) -> base.preprocessor_type:
+    if name == "identity":
+        return preprocess_identity
+    elif name == "black_and_white":
+        return preprocess_black_on_white
+    else:
+        raise ValueError("Preprocessors allowed: [identity, black_and_white].")
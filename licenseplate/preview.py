@@ -0,0 +1,165 @@
+import html
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Iterator, Optional
+from urllib.parse import quote, unquote
+
+import cv2
+from numpy.typing import NDArray
+
+BOUNDARY = "frame"
+
+
+class PreviewChannel:
+    """Latest annotated frame of one camera. Cameras only render and publish
+    while someone is watching; the JPEG is encoded once per frame by the first
+    viewer that needs it and shared with the others."""
+
+    def __init__(self, max_fps: float = 5.0, max_width: int = 640, quality: int = 70):
+        self.min_interval = 1 / max_fps
+        self.max_width = max_width
+        self.quality = quality
+        self.viewers = 0
+        self._condition = threading.Condition()
+        self._encode_lock = threading.Lock()
+        self._image: Optional[NDArray] = None
+        self._sequence = 0
+        self._jpeg: Optional[tuple[int, bytes]] = None
+        self._last_publish = 0.0
+
+    def wants_frame(self) -> bool:
+        return (
+            self.viewers > 0 and monotonic() - self._last_publish >= self.min_interval
+        )
+
+    def publish(self, image: NDArray):
+        """Takes a copy, so the frame buffer can be reused right after."""
+        height, width = image.shape[:2]
+        if width > self.max_width:
+            size = (self.max_width, round(height * self.max_width / width))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        else:
+            image = image.copy()
+        with self._condition:
+            self._image = image
+            self._sequence += 1
+            self._last_publish = monotonic()
+            self._condition.notify_all()
+
+    @contextmanager
+    def watch(self) -> Iterator[None]:
+        with self._condition:
+            self.viewers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.viewers -= 1
+                if self.viewers == 0:
+                    self._image = None
+                    self._jpeg = None
+
+    def wait_frame(self, after: int, timeout: float) -> Optional[tuple[int, bytes]]:
+        """Waits for a frame newer than `after`, returns it with its number."""
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._sequence > after and self._image is not None, timeout
+            ):
+                return None
+            sequence, image = self._sequence, self._image
+        with self._encode_lock:
+            if self._jpeg is None or self._jpeg[0] < sequence:
+                assert image is not None
+                _, encoded = cv2.imencode(
+                    ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+                )
+                self._jpeg = (sequence, encoded.tobytes())
+            return self._jpeg
+
+
+class _PreviewRequestHandler(BaseHTTPRequestHandler):
+    server: "PreviewServer"
+
+    def do_GET(self):
+        path = unquote(self.path.split("?")[0])
+        if path == "/":
+            self.send_index()
+        elif path.endswith(".mjpg") and path[1:-5] in self.server.channels:
+            self.send_stream(self.server.channels[path[1:-5]])
+        else:
+            self.send_error(404)
+
+    def send_index(self):
+        links = "".join(
+            f'<li><a href="/{quote(name)}.mjpg">{html.escape(name)}</a></li>'
+            for name in sorted(self.server.channels)
+        )
+        body = f"<html><body><ul>{links}</ul></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, channel: PreviewChannel):
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+        )
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sequence = 0
+        with channel.watch():
+            while not self.server.stopping:
+                frame = channel.wait_frame(sequence, timeout=1.0)
+                if frame is None:
+                    continue
+                sequence, jpeg = frame
+                try:
+                    self.wfile.write(
+                        f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                        f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n"
+                    )
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PreviewServer(ThreadingHTTPServer):
+    """Serves the cameras as MJPEG streams at '/<instance>/<camera>.mjpg'."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        max_fps: float = 5.0,
+        max_width: int = 640,
+        quality: int = 70,
+    ):
+        super().__init__(address, _PreviewRequestHandler)
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.quality = quality
+        self.channels: dict[str, PreviewChannel] = {}
+        self.stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add_channel(self, name: str) -> PreviewChannel:
+        channel = PreviewChannel(self.max_fps, self.max_width, self.quality)
+        self.channels[name] = channel
+        return channel
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self.shutdown()
+        self.server_close()
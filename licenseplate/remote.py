@@ -0,0 +1,337 @@
+import base64
+import http.client
+import json
+import queue
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from . import base
+
+
+def encode_frame(
+    image: NDArray, payload: str, jpeg_quality: int = 90
+) -> tuple[bytes, dict[str, str]]:
+    if payload == "jpeg":
+        ok, encoded = cv2.imencode(
+            ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        )
+        if not ok:
+            raise ValueError("Could not encode the frame as JPEG.")
+        return encoded.tobytes(), {"Content-Type": "image/jpeg"}
+    elif payload == "raw":
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        return image.tobytes(), {
+            "Content-Type": "application/octet-stream",
+            "X-Frame-Shape": ",".join(map(str, image.shape)),
+        }
+    else:
+        raise ValueError("Payloads allowed: [jpeg, raw].")
+
+
+def decode_frame(body: bytes, headers) -> NDArray:
+    if headers.get("Content-Type") == "application/octet-stream":
+        shape = tuple(map(int, headers["X-Frame-Shape"].split(",")))
+        return np.frombuffer(body, dtype=np.uint8).reshape(shape)
+    # PNG carries preprocessed plates, which may have a single channel
+    flags = (
+        cv2.IMREAD_UNCHANGED
+        if headers.get("Content-Type") == "image/png"
+        else cv2.IMREAD_COLOR
+    )
+    image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), flags)
+    if image is None:
+        raise ValueError("Could not decode the frame.")
+    return image
+
+
+def encode_png(image: NDArray) -> str:
+    _, encoded = cv2.imencode(".png", image)
+    return base64.b64encode(encoded.tobytes()).decode("ascii")
+
+
+def encode_jpeg(image: NDArray, quality: int = 90) -> str:
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return base64.b64encode(encoded.tobytes()).decode("ascii")
+
+
+def decode_image(data: str) -> NDArray:
+    buffer = np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+
+
+def extractor_results_to_json(
+    results: list[base.ExtractorResult],
+) -> list[dict[str, Any]]:
+    return [
+        {
+            "text": e.text,
+            "confidence": e.confidence,
+            "box": [list(point) for point in e.box],
+        }
+        for e in results
+    ]
+
+
+def extractor_results_from_json(
+    data: list[dict[str, Any]]
+) -> list[base.ExtractorResult]:
+    return [
+        base.ExtractorResult(
+            text=e["text"],
+            confidence=e["confidence"],
+            box=tuple(tuple(point) for point in e["box"]),
+        )
+        for e in data
+    ]
+
+
+def results_to_json(results: base.DetectionResults) -> dict[str, Any]:
+    out: dict[str, Any] = {
+        "det_results": [
+            {
+                "finder_result": {
+                    "confidence": r.finder_result.confidence,
+                    "box": list(r.finder_result.box),
+                },
+                "ext_results": extractor_results_to_json(r.ext_results),
+                "text_preprocessed_image": encode_png(r.text_preprocessed_image),
+                "text_read": r.text_read,
+            }
+            for r in results.det_results
+        ]
+    }
+    # only sent when the frame preprocessor changed the frame
+    if results.general_preprocessed_image is not results.original_image:
+        out["general_preprocessed_image"] = encode_jpeg(
+            results.general_preprocessed_image
+        )
+    return out
+
+
+def results_from_json(image: NDArray, data: dict[str, Any]) -> base.DetectionResults:
+    preprocessed_image = (
+        decode_image(data["general_preprocessed_image"])
+        if "general_preprocessed_image" in data
+        else image
+    )
+    out = base.DetectionResults(
+        original_image=image,
+        general_preprocessed_image=preprocessed_image,
+        det_results=[],
+    )
+    for r in data["det_results"]:
+        finder_result = base.FinderResult(
+            confidence=r["finder_result"]["confidence"],
+            box=tuple(r["finder_result"]["box"]),
+        )
+        x1, y1, x2, y2 = finder_result.box
+        out.det_results.append(
+            base.SingleDetectionResult(
+                cropped_plate_image=preprocessed_image[y1:y2, x1:x2],
+                text_preprocessed_image=decode_image(r["text_preprocessed_image"]),
+                finder_result=finder_result,
+                ext_results=extractor_results_from_json(r["ext_results"]),
+                text_read=r.get("text_read", True),
+            )
+        )
+    return out
+
+
+class BatchingDetector:
+    """Collects frames from concurrent requests and runs them through the model
+    in batches of at most `max_batch_size`, waiting up to `max_batch_delay`
+    seconds for a batch to fill."""
+
+    def __init__(
+        self,
+        model: base.PlateDetectionModel,
+        max_batch_size: int = 8,
+        max_batch_delay: float = 0.01,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self._queue: queue.Queue[tuple[NDArray, Future]] = queue.Queue()
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, image: NDArray) -> Future:
+        future: Future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = monotonic() + self.max_batch_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self.model.detect_plates_batch([image for image, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class _DetectionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "InferenceServer"
+
+    def do_POST(self):
+        if self.path not in ("/detect", "/read"):
+            self.send_error(404)
+            return
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.send_error(400, "Content-Length is required.")
+            return
+        body = self.rfile.read(int(length))
+        try:
+            image = decode_frame(body, self.headers)
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+            return
+        try:
+            if self.path == "/read":
+                # plates queued for deferred OCR, read outside the batches
+                data: Any = extractor_results_to_json(
+                    self.server.detector.model.read_text(image)
+                )
+            else:
+                data = results_to_json(self.server.detector.submit(image).result())
+        except Exception as e:
+            print(f"Request to {self.path} failed: {e}")
+            self.send_error(500, "Model failed.")
+            return
+        response = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], detector: BatchingDetector):
+        super().__init__(address, _DetectionRequestHandler)
+        self.detector = detector
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self.detector.start()
+        super().serve_forever(poll_interval)
+
+
+class RemoteDetectionModel(base.PlateDetectionModel):
+    def __init__(
+        self,
+        url: str,
+        payload: str = "jpeg",
+        jpeg_quality: int = 90,
+        timeout: float = 5.0,
+        pool_size: int = 4,
+    ):
+        parsed = urlsplit(url)
+        if parsed.scheme != "http" or parsed.hostname is None:
+            raise ValueError(f"Unsupported detection server URL: {url}")
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = parsed.path.rstrip("/")
+        self.payload = payload
+        self.jpeg_quality = jpeg_quality
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(
+            pool_size
+        )
+
+    def _send(
+        self,
+        connection: http.client.HTTPConnection,
+        endpoint: str,
+        body: bytes,
+        headers: dict[str, str],
+    ) -> Any:
+        try:
+            connection.request("POST", self.path + endpoint, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        if response.status != 200:
+            raise http.client.HTTPException(
+                f"Detection server returned {response.status}."
+            )
+        return json.loads(data)
+
+    def _request(self, endpoint: str, body: bytes, headers: dict[str, str]) -> Any:
+        """Sends on an idle connection if there is one. Only such a reused
+        connection is retried, as the server may have closed it meanwhile."""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = None
+        if connection is not None:
+            try:
+                return self._send(connection, endpoint, body, headers)
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                pass  # stale keep-alive connection
+        connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout
+        )
+        return self._send(connection, endpoint, body, headers)
+
+    def detect_plates(
+        self, image: NDArray, lores_image: Optional[NDArray] = None
+    ) -> base.DetectionResults:
+        """Sends the full frame only. `lores_image` is ignored: the server
+        downscales frames for detection itself when it has a detection_width.
+        Without an answer the frame is returned without plates."""
+        body, headers = encode_frame(image, self.payload, self.jpeg_quality)
+        try:
+            data = self._request("/detect", body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            print(f"Remote detection failed: {e}")
+            return base.DetectionResults(
+                original_image=image, general_preprocessed_image=image, det_results=[]
+            )
+        return results_from_json(image, data)
+
+    def read_text(self, plate_image: NDArray) -> list[base.ExtractorResult]:
+        """Reads a plate on the server. Raises OSError while the server cannot
+        be reached, so deferred OCR keeps the plate for later."""
+        _, encoded = cv2.imencode(".png", plate_image)
+        data = self._request("/read", encoded.tobytes(), {"Content-Type": "image/png"})
+        return extractor_results_from_json(data)
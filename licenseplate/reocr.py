@@ -0,0 +1,180 @@
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from .action import summarise_extractions
+from .detection import TextExtractor
+from .logger import LOG_FILENAME, find_camera_roots, iter_log_entries
+from .preprocessor import get_preprocessor
+from .retention import read_artefact
+from .threads import ThreadSettings, apply_thread_settings, default_thread_settings
+
+
+@dataclass(frozen=True)
+class ReocrSettings:
+    plate_preprocessor: str = "black_and_white"
+    text_allow_list: Optional[str] = None
+    ocr_decoder: str = "beamsearch"
+    required_confidence: float = 0.5
+
+
+_settings: Optional[ReocrSettings] = None
+_extractor: Optional[TextExtractor] = None
+
+
+def _init_worker(settings: ReocrSettings, thread_settings: ThreadSettings):
+    global _settings, _extractor
+    apply_thread_settings(thread_settings)
+    _settings = settings
+    _extractor = TextExtractor(settings.text_allow_list, settings.ocr_decoder)
+
+
+def _decode_artefact(camera_root: Path, path: str) -> NDArray:
+    data = read_artefact(camera_root, path)
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not decode {path}.")
+    return image
+
+
+def load_plate(
+    camera_root: Path, plate: dict[str, Any], settings: ReocrSettings
+) -> Optional[NDArray]:
+    """The OCR input of a logged plate: the saved crop run through the plate
+    preprocessor, or the saved preprocessed crop if only that was kept."""
+    if "plate_image" in plate:
+        preprocess = get_preprocessor(settings.plate_preprocessor)
+        return preprocess(_decode_artefact(camera_root, plate["plate_image"]))
+    if "augmented_plate_image" in plate:
+        return _decode_artefact(camera_root, plate["augmented_plate_image"])
+    return None
+
+
+def reocr_entries(
+    camera_root: Path, entries: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    assert _settings is not None and _extractor is not None
+    out = []
+    for entry in entries:
+        for i, plate in enumerate(entry["detected"]):
+            record: dict[str, Any] = {
+                "time": entry["time"],
+                "plate": i,
+                "previous": [e["text"] for e in plate.get("detected", [])],
+            }
+            try:
+                image = load_plate(camera_root, plate, _settings)
+            except (OSError, ValueError) as e:
+                print(f"Could not load plate {i} of {entry['time']}: {e}")
+                image = None
+            if image is None:
+                record["detected"] = None
+            else:
+                found_text = [
+                    r
+                    for r in _extractor(image)
+                    if r.confidence >= _settings.required_confidence
+                ]
+                record["detected"] = summarise_extractions(found_text)
+            out.append(record)
+    return out
+
+
+def read_done(output_path: Path) -> set[tuple[str, int]]:
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # cut short by an interrupted run
+            done.add((record["time"], record["plate"]))
+    return done
+
+
+def pending_entries(
+    camera_root: Path, done: set[tuple[str, int]]
+) -> Iterator[dict[str, Any]]:
+    for entry in iter_log_entries(camera_root / LOG_FILENAME):
+        plates = entry.get("detected")
+        if "type" in entry or not plates:
+            continue
+        if all((entry["time"], i) in done for i in range(len(plates))):
+            continue
+        yield entry
+
+
+def reocr_camera(
+    executor: ProcessPoolExecutor,
+    camera_root: Path,
+    output_name: str,
+    batch_size: int,
+    max_in_flight: int,
+) -> int:
+    """Writes the new readings of a camera to `<camera_root>/<output_name>.jsonl`,
+    skipping the plates an earlier run already wrote there."""
+    output_path = camera_root / f"{output_name}.jsonl"
+    done = read_done(output_path)
+    entries = pending_entries(camera_root, done)
+    written = 0
+
+    with open(output_path, "a+") as output:
+        if output.tell() > 0:
+            output.seek(output.tell() - 1)
+            if output.read(1) != "\n":
+                output.write("\n")  # after a record cut short by an interruption
+        in_flight: set[Future] = set()
+        while True:
+            while len(in_flight) < max_in_flight:
+                batch = list(islice(entries, batch_size))
+                if not batch:
+                    break
+                in_flight.add(executor.submit(reocr_entries, camera_root, batch))
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for record in future.result():
+                    if (record["time"], record["plate"]) in done:
+                        continue
+                    output.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    written += 1
+            output.flush()
+            print(
+                f"\r{camera_root}: {written} plates re-read",
+                end="",
+                file=sys.stderr,
+                flush=True,
+            )
+    print(file=sys.stderr)
+    return written
+
+
+def run_reocr(
+    paths: list[Path],
+    settings: ReocrSettings,
+    output_name: str = "reocr",
+    workers: int = 1,
+    batch_size: int = 32,
+):
+    camera_roots = find_camera_roots(paths)
+    if not camera_roots:
+        print(f"No {LOG_FILENAME} found.")
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(settings, default_thread_settings(workers)),
+    ) as executor:
+        for camera_root in camera_roots:
+            reocr_camera(executor, camera_root, output_name, batch_size, 2 * workers)
@@ -0,0 +1,260 @@
+import bisect
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+ARTEFACT_DIRECTORIES = ("original", "marked", "plates", "augmented")
+ARCHIVE_DIRECTORY = "archive"
+ARCHIVE_KEY_FORMAT = "%Y-%m-%dT%H-%M"
+DOWNSAMPLED_COMMENT = b"downsampled"
+
+
+@dataclass
+class RetentionPolicy:
+    camera_max_bytes: Optional[int] = None
+    total_max_bytes: Optional[int] = None
+    pack_window: timedelta = timedelta(hours=1)
+    pack_delay: timedelta = timedelta(minutes=1)
+    interval: float = 300.0
+    policy: str = "delete"
+    downsample_scale: float = 0.5
+    downsample_quality: int = 60
+
+
+def artefact_time(relative_path: Path) -> datetime:
+    """Event time of a file saved by LocalSave, e.g. 'original/<time>.jpg' or
+    'plates/<time>/<time>-0.jpg'."""
+    if relative_path.parts[0] in ("plates", "augmented"):
+        return datetime.fromisoformat(relative_path.parts[1])
+    return datetime.fromisoformat(relative_path.stem)
+
+
+def window_start(time: datetime, window: timedelta) -> datetime:
+    midnight = time.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + ((time - midnight) // window) * window
+
+
+def iter_loose_artefacts(camera_root: Path) -> Iterator[tuple[Path, datetime]]:
+    for directory in ARTEFACT_DIRECTORIES:
+        for path in (camera_root / directory).rglob("*"):
+            if not path.is_file():
+                continue
+            relative_path = path.relative_to(camera_root)
+            try:
+                yield relative_path, artefact_time(relative_path)
+            except ValueError:
+                continue
+
+
+def list_archives(camera_root: Path) -> list[tuple[datetime, Path]]:
+    out = []
+    for path in (camera_root / ARCHIVE_DIRECTORY).glob("*.zip"):
+        try:
+            out.append((datetime.strptime(path.stem, ARCHIVE_KEY_FORMAT), path))
+        except ValueError:
+            continue
+    return sorted(out)
+
+
+def read_artefact(camera_root: Path, relative_path: str | Path) -> bytes:
+    """Reads a saved image, whether it is still on disk or already packed."""
+    relative_path = Path(relative_path)
+    path = camera_root / relative_path
+    if path.exists():
+        return path.read_bytes()
+    archives = list_archives(camera_root)
+    index = bisect.bisect_right(
+        [start for start, _ in archives], artefact_time(relative_path)
+    )
+    if index == 0:
+        raise FileNotFoundError(path)
+    with zipfile.ZipFile(archives[index - 1][1]) as archive:
+        try:
+            return archive.read(relative_path.as_posix())
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+
+def _remove_empty_directories(camera_root: Path, before: datetime):
+    """Removes empty per-frame directories older than `before` only, as
+    LocalSave creates the directory of the current frame before writing into
+    it."""
+    for directory in ("plates", "augmented"):
+        for path in (camera_root / directory).glob("*"):
+            try:
+                if datetime.fromisoformat(path.name) >= before:
+                    continue
+            except ValueError:
+                continue
+            if path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+
+
+def pack_closed_windows(camera_root: Path, policy: RetentionPolicy, now: datetime):
+    windows: dict[datetime, list[Path]] = {}
+    for relative_path, time in iter_loose_artefacts(camera_root):
+        start = window_start(time, policy.pack_window)
+        if start + policy.pack_window + policy.pack_delay <= now:
+            windows.setdefault(start, []).append(relative_path)
+
+    if windows:
+        (camera_root / ARCHIVE_DIRECTORY).mkdir(exist_ok=True)
+    for start, paths in sorted(windows.items()):
+        archive_path = (
+            camera_root
+            / ARCHIVE_DIRECTORY
+            / f"{start.strftime(ARCHIVE_KEY_FORMAT)}.zip"
+        )
+        with zipfile.ZipFile(archive_path, "a", zipfile.ZIP_STORED) as archive:
+            packed = set(archive.namelist())
+            for relative_path in sorted(paths):
+                if relative_path.as_posix() not in packed:
+                    archive.write(camera_root / relative_path, relative_path.as_posix())
+        for relative_path in paths:
+            (camera_root / relative_path).unlink()
+    # frames before the window that is open until pack_delay has passed are
+    # all in closed windows
+    _remove_empty_directories(
+        camera_root, window_start(now - policy.pack_delay, policy.pack_window)
+    )
+
+
+def downsample_archive(archive_path: Path, scale: float, quality: int):
+    tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+    with zipfile.ZipFile(archive_path) as source, zipfile.ZipFile(
+        tmp_path, "w", zipfile.ZIP_STORED
+    ) as target:
+        for info in source.infolist():
+            data = source.read(info)
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+            if image is not None:
+                image = cv2.resize(
+                    image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+                )
+                _, encoded = cv2.imencode(
+                    ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality]
+                )
+                data = encoded.tobytes()
+            target.writestr(info.filename, data)
+        target.comment = DOWNSAMPLED_COMMENT
+    os.replace(tmp_path, archive_path)
+
+
+def disk_usage(camera_root: Path) -> int:
+    total = 0
+    for directory in ARTEFACT_DIRECTORIES + (ARCHIVE_DIRECTORY,):
+        for path in (camera_root / directory).rglob("*"):
+            if path.is_file():
+                total += path.stat().st_size
+    return total
+
+
+class RetentionManager:
+    """Packs closed time windows of saved images into archives and keeps the
+    cameras within their disk budgets, reducing the oldest data first."""
+
+    def __init__(self, policy: RetentionPolicy, camera_roots: dict[str, Path]):
+        self.policy = policy
+        self.camera_roots = camera_roots
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reduce_oldest(self, camera_root: Path) -> Optional[int]:
+        """Downsamples or deletes the oldest data of a camera and returns the
+        bytes freed, or None if there is nothing left to reduce. With the
+        downsample policy the oldest archive is downsampled before it is
+        deleted. Directories emptied here are removed once their window closes."""
+        archives = list_archives(camera_root)
+        if archives:
+            _, archive_path = archives[0]
+            size = archive_path.stat().st_size
+            if self.policy.policy == "downsample":
+                with zipfile.ZipFile(archive_path) as archive:
+                    downsampled = archive.comment == DOWNSAMPLED_COMMENT
+                if not downsampled:
+                    downsample_archive(
+                        archive_path,
+                        self.policy.downsample_scale,
+                        self.policy.downsample_quality,
+                    )
+                    return size - archive_path.stat().st_size
+            archive_path.unlink()
+            return size
+
+        loose = sorted(iter_loose_artefacts(camera_root), key=lambda x: x[1])
+        if not loose:
+            return None
+        oldest = loose[0][1]
+        freed = 0
+        for relative_path, time in loose:
+            if time != oldest:
+                break
+            path = camera_root / relative_path
+            freed += path.stat().st_size
+            path.unlink()
+        return freed
+
+    def _oldest_data(self, camera_root: Path) -> datetime:
+        archives = list_archives(camera_root)
+        if archives:
+            return archives[0][0]
+        return min(
+            (t for _, t in iter_loose_artefacts(camera_root)), default=datetime.max
+        )
+
+    def enforce_budgets(self):
+        usage = {name: disk_usage(root) for name, root in self.camera_roots.items()}
+
+        if self.policy.camera_max_bytes is not None:
+            for name, root in self.camera_roots.items():
+                while usage[name] > self.policy.camera_max_bytes:
+                    freed = self.reduce_oldest(root)
+                    if freed is None:
+                        break
+                    usage[name] -= freed
+
+        if self.policy.total_max_bytes is not None:
+            while sum(usage.values()) > self.policy.total_max_bytes:
+                name = min(
+                    self.camera_roots,
+                    key=lambda n: self._oldest_data(self.camera_roots[n]),
+                )
+                freed = self.reduce_oldest(self.camera_roots[name])
+                if freed is None:
+                    break
+                usage[name] -= freed
+
+    def run_once(self):
+        now = datetime.now()
+        for root in self.camera_roots.values():
+            pack_closed_windows(root, self.policy, now)
+        self.enforce_budgets()
+
+    def loop(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except OSError as e:
+                print(f"Retention failed: {e}")
+            self._stop.wait(self.policy.interval)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,246 @@
+import json
+import os
+import queue
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from pathlib import Path
+from time import monotonic
+from typing import Any, Iterator, Optional
+
+
+class Spool:
+    """Append-only JSONL file of event batches with a persisted replay offset."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset_path = path.with_name(path.name + ".offset")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _offset(self) -> int:
+        try:
+            return int(self.offset_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def is_empty(self) -> bool:
+        try:
+            return self.path.stat().st_size <= self._offset()
+        except FileNotFoundError:
+            return True
+
+    def append(self, events: list[dict[str, Any]]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(events, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending(self) -> Iterator[tuple[int, list[dict[str, Any]]]]:
+        """Yields spooled batches in order, each with the offset just past it."""
+        if not self.path.exists():
+            return
+        with open(self.path) as f:
+            f.seek(self._offset())
+            while line := f.readline():
+                if not line.endswith("\n"):
+                    return  # interrupted write
+                try:
+                    events = json.loads(line)
+                except json.JSONDecodeError:
+                    events = []
+                yield f.tell(), events
+
+    def commit(self, offset: int):
+        tmp_path = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        tmp_path.write_text(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+        self.offset_path.unlink(missing_ok=True)
+
+
+class EventSink(ABC):
+    """Delivers detection events in batches from a background thread.
+
+    Batches that cannot be delivered are spooled to disk and replayed in order
+    before any newer batch is sent."""
+
+    def __init__(
+        self,
+        spool_path: Path,
+        batch_size: int = 50,
+        batch_interval: float = 1.0,
+        retry_interval: float = 5.0,
+        max_pending: int = 10000,
+    ):
+        self.spool = Spool(spool_path)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.retry_interval = retry_interval
+        self.max_pending = max_pending
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_retry = 0.0
+
+    @abstractmethod
+    def send(self, events: list[dict[str, Any]]) -> None:
+        """Delivers a batch, raising an exception on failure."""
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def submit(self, event: dict[str, Any]):
+        self._queue.put_nowait(event)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("The sink is already running.")
+        self._stop.clear()
+        self.open()
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("The sink is not running.")
+        self._stop.set()
+        self._thread.join()
+        self.close()
+
+    def _collect(self) -> list[dict[str, Any]]:
+        batch: list[dict[str, Any]] = []
+        deadline = monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _try_send(self, events: list[dict[str, Any]]) -> bool:
+        try:
+            self.send(events)
+            return True
+        except Exception as e:
+            print(f"{type(self).__name__}: delivery failed, spooling events: {e}")
+            self._next_retry = monotonic() + self.retry_interval
+            return False
+
+    def _replay(self):
+        if monotonic() < self._next_retry:
+            return
+        for offset, events in self.spool.pending():
+            if events and not self._try_send(events):
+                return
+            self.spool.commit(offset)
+        self.spool.clear()
+
+    def _spool_backlog(self):
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self.spool.append(batch)
+            if len(batch) < self.batch_size:
+                return
+
+    def deliver(self, batch: list[dict[str, Any]]):
+        if not self.spool.is_empty():
+            if batch:
+                self.spool.append(batch)
+            self._replay()
+        elif batch and not self._try_send(batch):
+            self.spool.append(batch)
+
+    def loop(self):
+        while not self._stop.is_set():
+            if self._queue.qsize() > self.max_pending:
+                self._spool_backlog()
+            self.deliver(self._collect())
+
+        self._next_retry = 0.0
+        while not self._queue.empty():
+            self.deliver(self._collect())
+        self._spool_backlog()
+
+
+class WebhookSink(EventSink):
+    def __init__(
+        self,
+        url: str,
+        spool_path: Path,
+        timeout: float = 5.0,
+        headers: Optional[dict[str, str]] = None,
+        **kwargs,
+    ):
+        super().__init__(spool_path, **kwargs)
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json"} | (headers or {})
+
+    def send(self, events: list[dict[str, Any]]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"events": events}).encode(),
+            headers=self.headers,
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class MqttSink(EventSink):
+    def __init__(
+        self,
+        host: str,
+        topic: str,
+        spool_path: Path,
+        port: int = 1883,
+        qos: int = 1,
+        timeout: float = 5.0,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(spool_path, **kwargs)
+        import paho.mqtt.client as mqtt
+
+        if hasattr(mqtt, "CallbackAPIVersion"):
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        else:
+            self.client = mqtt.Client()
+        if username is not None:
+            self.client.username_pw_set(username, password)
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.qos = qos
+        self.timeout = timeout
+
+    def open(self) -> None:
+        self.client.connect_async(self.host, self.port)
+        self.client.loop_start()
+
+    def close(self) -> None:
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def send(self, events: list[dict[str, Any]]) -> None:
+        if not self.client.is_connected():
+            raise ConnectionError(f"Not connected to {self.host}:{self.port}.")
+        info = self.client.publish(self.topic, json.dumps(events), qos=self.qos)
+        info.wait_for_publish(self.timeout)
+        if not info.is_published():
+            raise TimeoutError("The broker did not acknowledge the batch.")
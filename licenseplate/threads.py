@@ -0,0 +1,73 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+
+
+@dataclass
+class ThreadSettings:
+    torch_intra_op_threads: Optional[int] = None
+    torch_inter_op_threads: Optional[int] = None
+    opencv_threads: Optional[int] = None
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_thread_settings(workers: int) -> ThreadSettings:
+    """Splits the available cores evenly between workers (cameras or processes)
+    running inference at the same time."""
+    per_worker = max(1, available_cores() // max(workers, 1))
+    return ThreadSettings(
+        torch_intra_op_threads=per_worker,
+        torch_inter_op_threads=1,
+        opencv_threads=per_worker,
+    )
+
+
+def resolve_thread_settings(
+    configured: Optional[ThreadSettings], workers: int
+) -> ThreadSettings:
+    defaults = default_thread_settings(workers)
+    if configured is None:
+        return defaults
+    return ThreadSettings(
+        torch_intra_op_threads=configured.torch_intra_op_threads
+        or defaults.torch_intra_op_threads,
+        torch_inter_op_threads=configured.torch_inter_op_threads
+        or defaults.torch_inter_op_threads,
+        opencv_threads=configured.opencv_threads or defaults.opencv_threads,
+    )
+
+
+def apply_thread_settings(settings: ThreadSettings):
+    """Must run before any model is loaded; torch only accepts the inter-op
+    thread count before its first parallel operation."""
+    try:
+        import torch
+    except ImportError:
+        torch = None  # remote detection only
+
+    if torch is not None and settings.torch_intra_op_threads is not None:
+        torch.set_num_threads(settings.torch_intra_op_threads)
+    if torch is not None and settings.torch_inter_op_threads is not None:
+        try:
+            torch.set_num_interop_threads(settings.torch_inter_op_threads)
+        except RuntimeError:
+            print("Torch inter-op thread count already fixed, leaving it unchanged.")
+    if settings.opencv_threads is not None:
+        cv2.setNumThreads(settings.opencv_threads)
+
+
+def pin_current_thread(cpus: Optional[list[int]]):
+    """Restricts the calling thread to the given cores (Linux only)."""
+    if not cpus:
+        return
+    if not hasattr(os, "sched_setaffinity"):
+        print("CPU affinity is not supported on this platform, ignoring it.")
+        return
+    os.sched_setaffinity(0, cpus)
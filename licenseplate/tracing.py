@@ -0,0 +1,141 @@
+import json
+import os
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, ContextManager, Iterator, Optional
+
+
+class Tracer:
+    """Records spans as Chrome trace events (loadable in chrome://tracing and
+    Perfetto). Spans are only recorded for sampled frames, and at most
+    `max_buffered_events` wait for the writer thread; the rest are dropped."""
+
+    def __init__(
+        self,
+        path: Path,
+        sample_rate: float = 1.0,
+        max_buffered_events: int = 100000,
+        flush_interval: float = 1.0,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_buffered_events = max_buffered_events
+        self.flush_interval = flush_interval
+        self.dropped_events = 0
+        self._events: deque[dict[str, Any]] = deque()
+        self._local = threading.local()
+        self._origin = perf_counter_ns()
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self._file = open(path, "w")
+        self._file.write("[")
+        self._first = True
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+        self._thread.start()
+
+    def _timestamp(self, ns: int) -> float:
+        return (ns - self._origin) / 1000
+
+    def _add(self, event: dict[str, Any]):
+        if len(self._events) >= self.max_buffered_events:
+            self.dropped_events += 1
+            return
+        self._events.append(event)
+
+    def begin_frame(self):
+        self._local.sampled = random.random() < self.sample_rate
+
+    def is_sampled(self) -> bool:
+        return getattr(self._local, "sampled", False)
+
+    def name_thread(self, name: str):
+        self._add(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": threading.get_native_id(),
+                "args": {"name": name},
+            }
+        )
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = perf_counter_ns()
+            self._add(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": self._timestamp(start),
+                    "dur": (end - start) / 1000,
+                    "pid": self._pid,
+                    "tid": threading.get_native_id(),
+                    "args": args,
+                }
+            )
+
+    def flush(self):
+        lines = []
+        while self._events:
+            lines.append(json.dumps(self._events.popleft(), separators=(",", ":")))
+        if not lines:
+            return
+        prefix = "\n" if self._first else ",\n"
+        self._first = False
+        self._file.write(prefix + ",\n".join(lines))
+        self._file.flush()
+
+    def loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._file.write("\n]\n")
+        self._file.close()
+        if self.dropped_events:
+            print(f"Tracing dropped {self.dropped_events} events.")
+
+
+_tracer: Optional[Tracer] = None
+_no_span = nullcontext()
+
+
+def start_tracing(path: Path, sample_rate: float = 1.0, max_buffered_events=100000):
+    global _tracer
+    if _tracer is not None:
+        raise RuntimeError("Tracing has already been started.")
+    _tracer = Tracer(path, sample_rate, max_buffered_events)
+
+
+def stop_tracing():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def begin_frame():
+    if _tracer is not None:
+        _tracer.begin_frame()
+
+
+def name_thread(name: str):
+    if _tracer is not None:
+        _tracer.name_thread(name)
+
+
+def span(name: str, **args) -> ContextManager:
+    if _tracer is None or not _tracer.is_sampled():
+        return _no_span
+    return _tracer.span(name, **args)
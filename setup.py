@@ -22,4 +22,8 @@ setup(
         "opencv-python",
         "easyocr",
     ],
+    extras_require={
+        "mqtt": ["paho-mqtt"],
+        "parquet": ["pyarrow"],
+    },
 )
@@ -0,0 +1,27 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from licenseplate import main as licenseplated
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "config.yaml"
+        sys.argv = ["licenseplated", "generate", str(config_path)]
+        licenseplated.main()
+        with open(config_path) as f:
+            data = yaml.load(f, yaml.SafeLoader)
+
+    config = licenseplated.Config.model_validate(data)
+    if config != licenseplated.example_config:
+        print("Error: the generated config does not load back.", file=sys.stderr)
+        exit(1)
+    print("The generated config loads back.")
+    exit(0)
+
+
+if __name__ == "__main__":
+    main()
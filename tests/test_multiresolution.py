@@ -0,0 +1,151 @@
+import sys
+import types
+from pathlib import Path
+from argparse import ArgumentParser
+from string import ascii_uppercase, digits
+from datetime import datetime
+from time import perf_counter
+
+import cv2
+
+
+class FakePicamera2:
+    """Stand-in for picamera2.Picamera2 serving images from a directory."""
+
+    image_paths: list[Path] = []
+
+    def __init__(self):
+        self.started = False
+        self.config: dict = {}
+        self.index = 0
+
+    def create_video_configuration(self, main, buffer_count, lores=None):
+        return {"main": main, "lores": lores, "buffer_count": buffer_count}
+
+    def configure(self, config):
+        self.config = config
+
+    def set_controls(self, controls):
+        pass
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def _next_image(self):
+        image = cv2.imread(str(self.image_paths[self.index % len(self.image_paths)]))
+        self.index += 1
+        return image
+
+    def capture_array(self, name="main"):
+        return cv2.resize(self._next_image(), self.config["main"]["size"])
+
+    def capture_arrays(self, names):
+        image = self._next_image()
+        out = []
+        for name in names:
+            resized = cv2.resize(image, self.config[name]["size"])
+            if self.config[name]["format"] == "YUV420":
+                resized = cv2.cvtColor(resized, cv2.COLOR_BGR2YUV_I420)
+            out.append(resized)
+        return out, {}
+
+
+picamera2_module = types.ModuleType("picamera2")
+picamera2_module.Picamera2 = FakePicamera2
+picamera2_module.Preview = None
+sys.modules["picamera2"] = picamera2_module
+
+from licenseplate.camera.raspberry import RaspberryCameraInterface
+from licenseplate.detection import YoloPlateDetectionModel, visualise_all
+from licenseplate.preprocessor import preprocess_identity, preprocess_black_on_white
+
+
+def main():
+    parser = ArgumentParser(
+        "Compare full-resolution detection with detection on a lores stream."
+    )
+    parser.add_argument(
+        "--images", type=Path, default=Path(__file__).parents[1] / "dataset/images/val"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).parent
+        / "test_results"
+        / ("multiresolution_test-" + datetime.now().isoformat()),
+    )
+    parser.add_argument(
+        "--weights",
+        type=Path,
+        default=Path(__file__).parents[1] / "runs/detect/train/weights/best.pt",
+    )
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--lores-width", type=int, default=640)
+    parser.add_argument("--lores-height", type=int, default=360)
+    args = parser.parse_args()
+
+    image_dir: Path = args.images.resolve()
+    results_dir: Path = args.output.resolve()
+
+    if not image_dir.exists() or not image_dir.is_dir():
+        print(
+            "Error: Provided Path for images does not exist or is not a directory.",
+            file=sys.stderr,
+        )
+        exit(1)
+
+    if results_dir.exists():
+        print("Error: Output directory already exists.", file=sys.stderr)
+        exit(1)
+
+    FakePicamera2.image_paths = sorted(image_dir.glob("*.jpg"))
+    camera = RaspberryCameraInterface(
+        (1920, 1080), 4, (args.lores_width, args.lores_height)
+    )
+    model = YoloPlateDetectionModel(
+        args.weights.resolve(),
+        preprocess_identity,
+        preprocess_black_on_white,
+        text_allow_list=ascii_uppercase + digits,
+    )
+
+    results_dir.mkdir(parents=True)
+    camera.start()
+    full_time = 0.0
+    lores_time = 0.0
+    for i in range(args.frames):
+        frame, lores_frame = camera.get_frames()
+        assert lores_frame is not None
+        assert lores_frame.shape == (args.lores_height, args.lores_width, 3)
+
+        start = perf_counter()
+        full_results = model.detect_plates(frame)
+        full_time += perf_counter() - start
+
+        start = perf_counter()
+        lores_results = model.detect_plates(frame, lores_frame)
+        lores_time += perf_counter() - start
+
+        for det_result in lores_results.det_results:
+            x1, y1, x2, y2 = det_result.finder_result.box
+            assert det_result.cropped_plate_image.shape[:2] == (y2 - y1, x2 - x1)
+            assert x2 <= frame.shape[1] and y2 <= frame.shape[0]
+
+        cv2.imwrite(str(results_dir / f"{i}-full.jpg"), visualise_all(full_results))
+        cv2.imwrite(str(results_dir / f"{i}-lores.jpg"), visualise_all(lores_results))
+        print(
+            f"{i}: full {len(full_results.det_results)} plates, "
+            f"lores {len(lores_results.det_results)} plates"
+        )
+    camera.stop()
+
+    print(f"Full resolution: {args.frames / full_time:.2f} FPS")
+    print(f"Lores detection: {args.frames / lores_time:.2f} FPS")
+    exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+from argparse import ArgumentParser
+from time import sleep
+
+import numpy as np
+
+from licenseplate.base import ExtractorResult, FinderResult
+from licenseplate.detection import YoloPlateDetectionModel
+from licenseplate.preprocessor import preprocess_identity, preprocess_black_on_white
+
+
+class SlowStartExtractor:
+    """Stand-in OCR whose first call takes `first_call` seconds, like EasyOCR
+    warming up, and every later one `call` seconds."""
+
+    def __init__(self, first_call: float, call: float):
+        self.first_call = first_call
+        self.call = call
+        self.calls = 0
+
+    def __call__(self, image) -> list[ExtractorResult]:
+        sleep(self.first_call if self.calls == 0 else self.call)
+        self.calls += 1
+        return [
+            ExtractorResult(
+                text="AB123", confidence=0.9, box=((0, 0), (10, 0), (10, 10), (0, 10))
+            )
+        ]
+
+
+def main():
+    parser = ArgumentParser("Check that one slow OCR call does not stop OCR for good.")
+    parser.add_argument(
+        "--weights",
+        type=Path,
+        default=Path(__file__).parents[1] / "runs/detect/train/weights/best.pt",
+    )
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=0.05)
+    parser.add_argument("--first-call", type=float, default=0.5)
+    parser.add_argument("--call", type=float, default=0.005)
+    args = parser.parse_args()
+
+    model = YoloPlateDetectionModel(
+        args.weights.resolve(),
+        preprocess_identity,
+        preprocess_black_on_white,
+        ocr_time_budget=args.budget,
+    )
+    extractor = SlowStartExtractor(args.first_call, args.call)
+    model.extractor = extractor  # type: ignore[assignment]
+
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), np.uint8)
+    boxes = [FinderResult(0.9, (x, 300, x + 200, 350)) for x in (100, 500, 900)]
+    read_per_frame = []
+    for _ in range(args.frames):
+        results = model.read_plates(model.crop_plates(frame, frame, boxes))
+        read_per_frame.append(sum(r.text_read for r in results.det_results))
+
+    print(f"Plates read per frame: {read_per_frame}")
+    if min(read_per_frame) < 1:
+        print("Error: a frame had none of its plates read.", file=sys.stderr)
+        exit(1)
+    if read_per_frame[-1] != len(boxes):
+        print("Error: the OCR time estimate did not recover.", file=sys.stderr)
+        exit(1)
+    exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import sys
+from time import sleep
+
+import cv2
+import numpy as np
+
+from licenseplate.base import ExtractorResult
+from licenseplate.detection import CachedTextExtractor
+
+
+class CountingExtractor:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, image) -> list[ExtractorResult]:
+        self.calls += 1
+        height, width = image.shape[:2]
+        return [
+            ExtractorResult(
+                text=f"READ{self.calls}",
+                confidence=0.9,
+                box=((0, 0), (width, 0), (width, height), (0, height)),
+            )
+        ]
+
+
+def make_plate(text: str) -> np.ndarray:
+    plate = np.full((60, 240, 3), 255, np.uint8)
+    cv2.putText(plate, text, (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 0), 3)
+    return plate
+
+
+def check(condition: bool, message: str):
+    if not condition:
+        print(f"Error: {message}", file=sys.stderr)
+        exit(1)
+
+
+def main():
+    plate, other_plate = make_plate("AB1234"), make_plate("XY9876")
+    extractor = CountingExtractor()
+    cache = CachedTextExtractor(extractor, max_size=8, ttl=0.5, report_interval=None)
+
+    first = cache(plate)
+    check(cache(plate.copy()) == first, "an equal crop should be a hit.")
+    check(extractor.calls == 1, "a hit should not run OCR.")
+
+    larger = cv2.resize(plate, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+    rescaled = cache(larger)
+    check(extractor.calls == 1, "a resized equal crop should be a hit.")
+    check(rescaled[0].box[2] == (480, 120), "a hit should be rescaled to the crop.")
+
+    cache(other_plate)
+    check(extractor.calls == 2, "a different plate should be a miss.")
+
+    sleep(0.6)
+    check(cache(plate) != first, "an expired reading should be read again.")
+    check(extractor.calls == 3, "an expired reading should run OCR.")
+
+    noisy = plate.copy()
+    noisy[20:24, 100:104] = 0
+    cache(noisy)
+    check(extractor.calls == 4, "exact matching should miss a noisy crop.")
+    near_cache = CachedTextExtractor(
+        extractor, ttl=5.0, max_distance=0.01, report_interval=None
+    )
+    near_cache(plate)
+    near_cache(noisy)
+    check(extractor.calls == 5, "near matching should accept a noisy crop.")
+    near_cache(other_plate)
+    check(extractor.calls == 6, "near matching should reject a different plate.")
+
+    check(cache.stats()["hits"] == 2, "the cache should count its hits.")
+    print(f"Cache stats: {cache.stats()}")
+    exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import sys
+import threading
+from pathlib import Path
+from argparse import ArgumentParser
+from string import ascii_uppercase, digits
+from time import perf_counter
+
+import cv2
+
+from licenseplate.detection import YoloPlateDetectionModel
+from licenseplate.preprocessor import preprocess_identity, preprocess_black_on_white
+from licenseplate.remote import BatchingDetector, InferenceServer, RemoteDetectionModel
+
+
+def main():
+    parser = ArgumentParser(
+        "Run a detection server on localhost and query it from several clients."
+    )
+    parser.add_argument(
+        "--images", type=Path, default=Path(__file__).parents[1] / "dataset/images/val"
+    )
+    parser.add_argument(
+        "--weights",
+        type=Path,
+        default=Path(__file__).parents[1] / "runs/detect/train/weights/best.pt",
+    )
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--payload", choices=["jpeg", "raw"], default="jpeg")
+    args = parser.parse_args()
+
+    image_dir: Path = args.images.resolve()
+    if not image_dir.exists() or not image_dir.is_dir():
+        print(
+            "Error: Provided Path for images does not exist or is not a directory.",
+            file=sys.stderr,
+        )
+        exit(1)
+
+    if not args.weights.exists():
+        print("Error: Cannot find weights.", file=sys.stderr)
+        exit(1)
+
+    model = YoloPlateDetectionModel(
+        args.weights.resolve(),
+        preprocess_identity,
+        preprocess_black_on_white,
+        text_allow_list=ascii_uppercase + digits,
+    )
+    server = InferenceServer(("127.0.0.1", 0), BatchingDetector(model, 8, 0.02))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    images = [cv2.imread(str(p)) for p in sorted(image_dir.glob("*.jpg"))]
+    images = images[: args.frames]
+    expected = [model.detect_plates(image) for image in images]
+
+    remote_model = RemoteDetectionModel(url, payload=args.payload)
+    mismatches = []
+
+    def client():
+        for image, local in zip(images, expected):
+            result = remote_model.detect_plates(image)
+            local_boxes = [r.finder_result.box for r in local.det_results]
+            remote_boxes = [r.finder_result.box for r in result.det_results]
+            if args.payload == "raw" and local_boxes != remote_boxes:
+                mismatches.append((local_boxes, remote_boxes))
+
+    start = perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+
+    server.shutdown()
+    print(
+        f"{args.clients * len(images) / elapsed:.2f} frames/s over {args.clients} clients"
+    )
+    if mismatches:
+        print(f"Error: {len(mismatches)} remote results differ.", file=sys.stderr)
+        exit(1)
+    exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import json
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, monotonic
+
+from licenseplate.sinks import WebhookSink
+
+
+class StandInBackend(ThreadingHTTPServer):
+    """Collects posted events, failing while `available` is False and
+    answering after `delay` seconds."""
+
+    def __init__(self, delay: float):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.available = False
+        self.delay = delay
+        self.received: list[dict] = []
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInBackend
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        sleep(self.server.delay)
+        if not self.server.available:
+            self.send_error(503)
+            return
+        self.server.received.extend(json.loads(body)["events"])
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = ArgumentParser("Deliver events to a flaky stand-in webhook backend.")
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    backend = StandInBackend(args.delay)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{backend.server_address[1]}/events"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool_path = Path(tmp) / "webhook.jsonl"
+        sink = WebhookSink(
+            url, spool_path, batch_size=20, batch_interval=0.1, retry_interval=0.2
+        )
+        sink.start()
+
+        start = monotonic()
+        for i in range(args.events // 2):
+            sink.submit({"index": i})
+        submit_time = monotonic() - start
+        sleep(1)
+        assert not sink.spool.is_empty(), "Events should be spooled while offline."
+
+        backend.available = True
+        for i in range(args.events // 2, args.events):
+            sink.submit({"index": i})
+        sleep(2)
+        sink.stop()
+
+        indices = [event["index"] for event in backend.received]
+        if indices != list(range(args.events)):
+            print("Error: events were lost or reordered.", file=sys.stderr)
+            exit(1)
+        if not sink.spool.is_empty():
+            print("Error: the spool was not drained.", file=sys.stderr)
+            exit(1)
+
+    backend.shutdown()
+    print(f"Submitting {args.events // 2} events took {submit_time * 1000:.2f} ms")
+    exit(0)
+
+
+if __name__ == "__main__":
+    main()